@@ -0,0 +1,222 @@
+"""
+Meme Forge web service - accepts meme jobs over HTTP and runs them on a shared MemeForge
+"""
+import os
+import time
+import uuid
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, jsonify, request, send_from_directory, url_for
+from flask_cors import CORS
+
+from meme_forge import MemeForge, MAX_VARIANTS, CACHE_MODES
+from meme_encoding import IMAGE_EXTENSIONS, output_settings
+
+GENERATED_DIR = "static/generated"
+
+
+class MemeJobQueue:
+    """Runs create_meme jobs on a bounded worker pool and keeps their status for polling"""
+
+    def __init__(self, forge, workers=4, max_pending=100, max_finished=1000):
+        self.forge = forge
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meme-job")
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, situation, style, mood, variants=1, output=None, cache="use"):
+        """Queue a job; returns the job dict, or None when the queue is full"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "situation": situation,
+            "style": style,
+            "mood": mood,
+            "variants": variants,
+            "output": output,
+            "cache": cache,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+            self._jobs[job["id"]] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"pending": self._pending, "max_pending": self.max_pending, "jobs": counts}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job):
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            result = self.forge.create_meme(job["situation"], style=job["style"], mood=job["mood"], concurrent=True,
+                                            variants=job["variants"], output=job["output"], cache=job["cache"])
+            error = None if result else "meme generation failed"
+        except Exception as e:
+            result, error = None, str(e)
+        with self._lock:
+            job["result"] = result
+            job["error"] = error
+            job["status"] = "done" if result else "failed"
+            job["finished_at"] = time.time()
+            self._pending -= 1
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+def _job_view(job):
+    """Public JSON shape of a job"""
+    view = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "situation": job["situation"],
+        "style": job["style"],
+        "mood": job["mood"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "status_url": url_for("job_status", job_id=job["id"]),
+    }
+    if job["error"]:
+        view["error"] = job["error"]
+    if job["status"] == "done":
+        view["result_url"] = url_for("job_result", job_id=job["id"])
+    return view
+
+
+def create_app(forge=None, workers=4, max_pending=100):
+    """Build the Flask app around one shared, warm MemeForge"""
+    app = Flask(__name__)
+    CORS(app)
+    forge = forge or MemeForge(pool_size=max(10, workers * 2))
+    jobs = MemeJobQueue(forge, workers=workers, max_pending=max_pending)
+    app.config["MEME_JOBS"] = jobs
+
+    @app.post("/api/memes")
+    def submit_meme():
+        data = request.get_json(silent=True) or {}
+        situation = (data.get("situation") or "").strip()
+        if not situation:
+            return jsonify({"error": "situation is required"}), 400
+        style = (data.get("style") or "").strip() or "cartoon/animation"
+        mood = (data.get("mood") or "").strip() or "funny"
+        try:
+            variants = int(data.get("variants") or 1)
+        except (TypeError, ValueError):
+            return jsonify({"error": "variants must be a number"}), 400
+        if not 1 <= variants <= MAX_VARIANTS:
+            return jsonify({"error": f"variants must be between 1 and {MAX_VARIANTS}"}), 400
+        cache = data.get("cache") or "use"
+        if cache not in CACHE_MODES:
+            return jsonify({"error": f"cache must be one of: {', '.join(CACHE_MODES)}"}), 400
+        output = None
+        if any(data.get(key) is not None for key in ("format", "quality", "max_dimension")):
+            try:
+                output = output_settings(data.get("format") or forge.output["format"], data.get("quality"),
+                                         data.get("max_dimension"))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+        job = jobs.submit(situation, style, mood, variants, output, cache)
+        if job is None:
+            response = jsonify({"error": "too many pending jobs, try again later"})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+        response = jsonify(_job_view(job))
+        response.headers["Location"] = url_for("job_status", job_id=job["id"])
+        return response, 202
+
+    @app.get("/api/jobs/<job_id>")
+    def job_status(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "unknown job"}), 404
+        return jsonify(_job_view(job))
+
+    @app.get("/api/jobs/<job_id>/result")
+    def job_result(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "unknown job"}), 404
+        if job["status"] == "failed":
+            return jsonify(_job_view(job)), 500
+        if job["status"] != "done":
+            return jsonify(_job_view(job)), 409
+        result = dict(job["result"])
+        filename = os.path.basename(result["image_path"])
+        result["image_url"] = url_for("generated_image", filename=filename)
+        for variant in result.get("variants", []):
+            variant["image_url"] = url_for("generated_image", filename=os.path.basename(variant["image_path"]))
+        return jsonify(result)
+
+    @app.get("/api/health")
+    def health():
+        return jsonify({"status": "ok", **jobs.stats()})
+
+    @app.get("/metrics")
+    def metrics():
+        # Prometheus scrape endpoint: stage latencies, retries, throttling, bytes moved
+        return Response(forge.metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/generated/<path:filename>")
+    def generated_image(filename):
+        # Only memes: the directory also holds the sequence counter and batch logs
+        if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+            return jsonify({"error": "not found"}), 404
+        # recaption() rewrites a meme under the same name, so clients revalidate
+        # every time (no-cache) against the ETag/Last-Modified sent with the file.
+        # MemeForge writes relative to the working directory, not the app package.
+        return send_from_directory(os.path.abspath(GENERATED_DIR), filename, max_age=0)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Meme Forge web service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="memes generated in parallel (default: 4)")
+    parser.add_argument("--max-pending", type=int, default=100, help="queued + running jobs before new ones get 503")
+    args = parser.parse_args()
+
+    print("🔥 Meme Forge service starting...")
+    app = create_app(workers=args.workers, max_pending=args.max_pending)
+    try:
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        app.config["MEME_JOBS"].shutdown()
+        app.config["MEME_JOBS"].forge.close()
+
+
+if __name__ == "__main__":
+    main()
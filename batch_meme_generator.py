@@ -1,9 +1,18 @@
 """
-Batch meme generator for predefined workplace situations
+Batch meme generator for predefined workplace situations or JSONL job files
 """
 from meme_forge import MemeForge
+from meme_encoding import OUTPUT_FORMATS, DEFAULT_OUTPUT, output_settings
+from meme_similarity import DEFAULT_THRESHOLD
+from meme_metrics import Metrics, JsonLinesExporter
+from meme_results import ResultsLog, FinishedIndex, compact, DEFAULT_LOG_PATH, DEFAULT_SUMMARY_PATH
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import hashlib
+import itertools
 import json
-import os
+import sys
+import time
 
 # Predefined workplace situations for quick testing
 WORKPLACE_SITUATIONS = [
@@ -19,47 +28,397 @@ WORKPLACE_SITUATIONS = [
     "When you spend 3 hours debugging and the issue is a missing semicolon"
 ]
 
-def generate_batch_memes():
-    """Generate memes for all predefined situations"""
-    
-    forge = MemeForge()
-    results = []
-    
+# How many memes may be in flight at once (text, image, download and overlay
+# stages of different memes overlap across workers)
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_STYLE = "cartoon/animation"
+DEFAULT_MOOD = "funny"
+# Situations captioned per chat call; 1 gives every meme its own text call
+DEFAULT_TEXT_BATCH = 8
+# Minimum seconds between rewrites of the --prometheus file during a run
+PROMETHEUS_WRITE_INTERVAL = 5.0
+
+
+def _create_one(forge, job, cache="use"):
+    """Run the full pipeline for one job; exceptions are reported, not raised"""
+    try:
+        return forge.create_meme(job["situation"], style=job["style"], mood=job["mood"], cache=cache,
+                                 variants=job.get("variants", 1), meme_text=job.get("meme_text")), None
+    except Exception as e:
+        return None, e
+
+
+def _with_batched_captions(forge, jobs, text_batch, cache):
+    """Caption (index, job) pairs text_batch at a time with one chat call per group
+
+    Jobs are still pulled lazily, one group at a time. The chat call for the
+    next group runs on a background thread while the current group is being
+    rendered, so the caller (_run_jobs' dispatcher) only waits for captions
+    when it outpaces them. A job the batched reply doesn't cover gets no
+    meme_text and falls back to create_meme's own text call; variant jobs
+    always do (they need n captions from one prompt).
+    """
+    def caption(group):
+        todo = [job for _, job in group if job.get("variants", 1) == 1]
+        if len(todo) > 1:
+            captions = forge.generate_meme_texts(
+                [(job["situation"], job["style"], job["mood"]) for job in todo], cache=cache, fallback=False)
+            for job, meme_text in zip(todo, captions):
+                if meme_text:
+                    job["meme_text"] = meme_text
+        return group
+
+    jobs = iter(jobs)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="meme-captions") as executor:
+        next_group = executor.submit(caption, list(itertools.islice(jobs, text_batch)))
+        while True:
+            group = next_group.result()
+            if not group:
+                return
+            next_group = executor.submit(caption, list(itertools.islice(jobs, text_batch)))
+            yield from group
+
+
+def _run_jobs(forge, jobs, max_workers, cache, on_result):
+    """Run (index, job) pairs with at most max_workers memes in flight
+
+    Jobs are pulled from the iterable only as workers free up, so a lazy source
+    is never read further ahead than the pool can use. on_result(index, job,
+    result, error) is called from this thread in completion order.
+    """
+    jobs = iter(jobs)
+    in_flight = {}
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="meme-batch") as executor:
+        while True:
+            while not exhausted and len(in_flight) < max_workers:
+                try:
+                    i, job = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(_create_one, forge, job, cache)] = (i, job)
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, job = in_flight.pop(future)
+                result, error = future.result()
+                on_result(i, job, result, error)
+
+
+def _report(i, job, result, error, total=None):
+    position = f"{i + 1}/{total}" if total else f"#{i + 1}"
+    print(f"\n[{position}] {job['situation']}")
+    if error is not None:
+        print(f"❌ Error: {error}")
+    elif result:
+        print(f"✅ Success!")
+        if result.get("similar_to"):
+            print(f"🔁 Reused the image of: {result['similar_to']}")
+    else:
+        print(f"❌ Failed")
+    print("-" * 30)
+
+
+def _result_record(i, job, result, error):
+    """Results-log line for a finished job (successful or not)"""
+    ok = error is None and bool(result)
+    record = {"index": i, "status": "ok" if ok else "failed"}
+    if job.get("id") is not None:
+        record["id"] = job["id"]
+    record.update({"situation": job["situation"], "style": job["style"], "mood": job["mood"]})
+    if ok:
+        record.update(result)
+    else:
+        record["error"] = str(error) if error is not None else "meme generation failed"
+    record["finished_at"] = time.time()
+    return record
+
+
+def _make_forge(max_workers, verbose=True, metrics_log=None, render_workers=0, output=None, reuse_threshold=None):
+    """One shared forge, with enough pooled connections for every worker"""
+    metrics = Metrics()
+    if metrics_log:
+        metrics.add_exporter(JsonLinesExporter(metrics_log))
+    output = output or DEFAULT_OUTPUT
+    return MemeForge(pool_size=max(10, max_workers), metrics=metrics, verbose=verbose,
+                     render_workers=render_workers, output_format=output["format"],
+                     output_quality=output["quality"], max_dimension=output["max_dimension"],
+                     reuse_threshold=reuse_threshold)
+
+
+class _PrometheusWriter:
+    """Rewrites a Prometheus textfile at most every PROMETHEUS_WRITE_INTERVAL seconds"""
+
+    def __init__(self, metrics, path):
+        self.metrics = metrics
+        self.path = path
+        self._last = 0.0
+
+    def maybe_write(self, force=False):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if force or now - self._last >= PROMETHEUS_WRITE_INTERVAL:
+            self.metrics.write_prometheus(self.path)
+            self._last = now
+
+
+def _close_exporters(metrics):
+    for exporter in metrics.exporters:
+        exporter.close()
+
+
+def _print_stage_latencies(metrics):
+    histograms = metrics.snapshot()["histograms"]
+    stages = {series: h for series, h in histograms.items() if series.startswith("meme_stage_seconds") and h["count"]}
+    if stages:
+        print("Stage latency (mean):")
+        for series, h in sorted(stages.items()):
+            stage = series.split('stage="', 1)[1].split('"', 1)[0]
+            print(f"   {stage}: {h['mean']:.2f}s over {h['count']} runs")
+
+
+def _print_stats(forge):
+    governor_stats = forge.governor.stats()
+    if governor_stats["retries"]:
+        print(f"Retries: {governor_stats['retries']} ({governor_stats['throttled']} throttled)")
+    if forge.cache is not None:
+        cache_stats = forge.cache.stats()
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate)")
+    if forge.similar is not None:
+        similar_stats = forge.similar.stats()
+        print(f"Near-duplicates: {similar_stats['hits']} reused a base image, {similar_stats['misses']} new "
+              f"({similar_stats['hit_rate']:.0%} hit rate)")
+    _print_stage_latencies(forge.metrics)
+
+
+def generate_batch_memes(situations=None, max_workers=DEFAULT_MAX_WORKERS, cache="use",
+                         log_path=DEFAULT_LOG_PATH, summary_path=DEFAULT_SUMMARY_PATH,
+                         verbose=True, metrics_log=None, prometheus_path=None, variants=1,
+                         text_batch=DEFAULT_TEXT_BATCH, render_workers=0, output=None, reuse_threshold=None):
+    """Generate memes for all predefined situations with at most max_workers in flight
+
+    cache is passed to create_meme: "use", "refresh" or "bypass". Every finished
+    meme is appended to the results log right away; the log is compacted into
+    batch_summary.json at the end. Returns the successful results in input
+    order, as read back from the summary (create_meme's fields plus
+    finished_at); nothing is held in memory while the batch runs.
+
+    verbose=False silences per-stage pipeline output. metrics_log receives one
+    JSON line per stage span; prometheus_path is kept up to date with the
+    Prometheus text format while the batch runs. variants > 1 renders that
+    many captions over each base image. Captions are requested text_batch
+    situations per chat call. render_workers > 0 draws captions in that many
+    worker processes. output (see meme_encoding.output_settings) sets the
+    format, quality and maximum dimension of every meme in the batch.
+    reuse_threshold lets near-duplicate situations share a base image.
+    """
+
+    situations = list(situations) if situations is not None else WORKPLACE_SITUATIONS
+    max_workers = max(1, int(max_workers))
+
     print("🔥 Batch Meme Generation Started! 🔥")
-    print(f"Generating {len(WORKPLACE_SITUATIONS)} memes...")
+    print(f"Generating {len(situations)} memes ({max_workers} at a time)...")
+    print(f"Progress log: {log_path}")
     print("=" * 50)
-    
-    for i, situation in enumerate(WORKPLACE_SITUATIONS, 1):
-        print(f"\n[{i}/{len(WORKPLACE_SITUATIONS)}] Processing...")
-        
+
+    jobs = (
+        (i, {"situation": situation, "style": DEFAULT_STYLE, "mood": DEFAULT_MOOD, "variants": variants})
+        for i, situation in enumerate(situations)
+    )
+    forge = _make_forge(max_workers, verbose, metrics_log, render_workers, output, reuse_threshold)
+    prometheus = _PrometheusWriter(forge.metrics, prometheus_path)
+    try:
+        with forge, ResultsLog(log_path, truncate=True) as log:
+            def on_result(i, job, result, error):
+                log.append(_result_record(i, job, result, error))
+                _report(i, job, result, error, total=len(situations))
+                prometheus.maybe_write()
+
+            _run_jobs(forge, _with_batched_captions(forge, jobs, text_batch, cache), max_workers, cache, on_result)
+    finally:
+        prometheus.maybe_write(force=True)
+        _close_exporters(forge.metrics)
+
+    # Summary is rebuilt in input order from the log
+    totals = compact(log_path, summary_path)
+
+    print(f"\n🎉 Batch generation complete!")
+    print(f"Generated: {totals['total_generated']}/{len(situations)} memes")
+    print(f"Summary saved to: {summary_path}")
+    _print_stats(forge)
+
+    with open(summary_path, encoding="utf-8") as f:
+        return json.load(f)["memes"]
+
+
+def _job_id(lineno, job):
+    """Stable ID for a job line: its own "id" field, else line number + content hash"""
+    if job.get("id") is not None:
+        return str(job["id"])
+    digest = hashlib.sha1(
+        json.dumps([job["situation"], job["style"], job["mood"]]).encode("utf-8")
+    ).hexdigest()[:12]
+    return f"{lineno}:{digest}"
+
+
+def read_jobs(stream, variants=1):
+    """Lazily parse JSONL job lines into (line number, job) pairs
+
+    Each line is an object with "situation" (or "title") and optional "style",
+    "mood", "variants" (a positive number; default: the variants argument)
+    and "id". Blank and malformed lines are reported and skipped.
+    """
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            result = forge.create_meme(situation)
-            if result:
-                results.append(result)
-                print(f"✅ Success!")
-            else:
-                print(f"❌ Failed")
-        except Exception as e:
-            print(f"❌ Error: {e}")
-        print("-" * 30)
-    
-    # Save results summary
-    summary = {
-        "total_generated": len(results),
-        "total_requested": len(WORKPLACE_SITUATIONS),
-        "memes": results
-    }
-    
-    os.makedirs("static/generated", exist_ok=True)
-    with open("static/generated/batch_summary.json", "w") as f:
-        json.dump(summary, f, indent=2)
-    
+            data = json.loads(line)
+            situation = (data.get("situation") or data.get("title") or "").strip()
+        except (ValueError, AttributeError):
+            print(f"⚠️  Skipping line {lineno}: not a JSON object")
+            continue
+        if not situation:
+            print(f"⚠️  Skipping line {lineno}: no situation")
+            continue
+        try:
+            job_variants = int(data.get("variants") or variants)
+        except (TypeError, ValueError):
+            job_variants = 0
+        if job_variants < 1:
+            print(f"⚠️  Skipping line {lineno}: variants must be a positive whole number")
+            continue
+        job = {
+            "situation": situation,
+            "style": data.get("style") or DEFAULT_STYLE,
+            "mood": data.get("mood") or DEFAULT_MOOD,
+            "variants": job_variants,
+            "id": data.get("id", data.get("request_id")),
+        }
+        job["id"] = _job_id(lineno, job)
+        yield lineno, job
+
+
+def generate_batch_from_jsonl(jobs_path, checkpoint_path=None, max_workers=DEFAULT_MAX_WORKERS, cache="use",
+                              verbose=True, metrics_log=None, prometheus_path=None, variants=1,
+                              text_batch=DEFAULT_TEXT_BATCH, render_workers=0, output=None,
+                              reuse_threshold=None):
+    """Generate memes for every job in a JSONL file ("-" for stdin), resuming from a checkpoint
+
+    The input is streamed, so its size doesn't matter. The checkpoint is the
+    results log of the run: finished jobs are appended as they complete and
+    jobs already logged as successful are skipped on the next run (their IDs
+    are looked up in an on-disk index, not held in memory). Returns
+    (generated, failed, skipped); compact the checkpoint with meme_results.py
+    for an aggregate summary. verbose, metrics_log, prometheus_path, variants,
+    text_batch, render_workers, output and reuse_threshold are as for
+    generate_batch_memes.
+    """
+    max_workers = max(1, int(max_workers))
+    if checkpoint_path is None:
+        checkpoint_path = "static/generated/stdin.checkpoint" if jobs_path == "-" else jobs_path + ".checkpoint"
+    done_ids = FinishedIndex(checkpoint_path)
+    counts = {"generated": 0, "failed": 0, "skipped": 0}
+
+    print("🔥 Batch Meme Generation Started! 🔥")
+    print(f"Reading jobs from {'stdin' if jobs_path == '-' else jobs_path} ({max_workers} at a time)...")
+    if done_ids:
+        print(f"Resuming: {len(done_ids)} jobs already finished")
+    print("=" * 50)
+
+    def pending(stream):
+        for lineno, job in read_jobs(stream, variants):
+            if job["id"] in done_ids:
+                counts["skipped"] += 1
+                continue
+            yield lineno - 1, job
+
+    checkpoint = ResultsLog(checkpoint_path)
+    forge = _make_forge(max_workers, verbose, metrics_log, render_workers, output, reuse_threshold)
+    prometheus = _PrometheusWriter(forge.metrics, prometheus_path)
+
+    def on_result(i, job, result, error):
+        checkpoint.append(_result_record(i, job, result, error))
+        counts["generated" if error is None and result else "failed"] += 1
+        _report(i, job, result, error)
+        prometheus.maybe_write()
+
+    stream = sys.stdin if jobs_path == "-" else open(jobs_path, encoding="utf-8")
+    try:
+        with forge:
+            jobs = _with_batched_captions(forge, pending(stream), text_batch, cache)
+            _run_jobs(forge, jobs, max_workers, cache, on_result)
+    finally:
+        checkpoint.close()
+        done_ids.close()
+        prometheus.maybe_write(force=True)
+        _close_exporters(forge.metrics)
+        if stream is not sys.stdin:
+            stream.close()
+
     print(f"\n🎉 Batch generation complete!")
-    print(f"Generated: {len(results)}/{len(WORKPLACE_SITUATIONS)} memes")
-    print(f"Summary saved to: static/generated/batch_summary.json")
-    
-    return results
+    print(f"Generated: {counts['generated']}, failed: {counts['failed']}, "
+          f"skipped (already done): {counts['skipped']}")
+    print(f"Checkpoint: {checkpoint_path}")
+    _print_stats(forge)
+    return counts["generated"], counts["failed"], counts["skipped"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate memes for predefined workplace situations or a JSONL job file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"maximum memes in flight at once (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--jobs", metavar="FILE",
+                        help='JSONL file of {"situation", "style", "mood", "id"} jobs, or "-" for stdin')
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="results log used to resume --jobs runs (default: <jobs file>.checkpoint)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", dest="cache", action="store_const", const="bypass", default="use",
+                             help="ignore the response cache and don't store new responses")
+    cache_group.add_argument("--refresh-cache", dest="cache", action="store_const", const="refresh",
+                             help="regenerate everything and overwrite cached responses")
+    parser.add_argument("--variants", type=int, default=1, metavar="N",
+                        help="captions rendered over each base image, from one chat call (default: 1)")
+    parser.add_argument("--text-batch", type=int, default=DEFAULT_TEXT_BATCH, metavar="K",
+                        help=f"situations captioned per chat call, 1 to disable batching (default: {DEFAULT_TEXT_BATCH})")
+    parser.add_argument("--render-workers", type=int, default=0, metavar="N",
+                        help="draw captions in N worker processes, 0 for the calling thread (default: 0)")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="png",
+                        help="output encoding for the memes (default: png)")
+    parser.add_argument("--quality", type=int, metavar="Q",
+                        help="WebP/JPEG quality 1-100 (default: 80 for webp, 85 for jpeg)")
+    parser.add_argument("--max-dimension", type=int, metavar="PX",
+                        help="downscale so the longer side is at most PX pixels")
+    parser.add_argument("--reuse-similar", type=float, nargs="?", const=DEFAULT_THRESHOLD, metavar="T",
+                        help="reuse the base image of an earlier situation at least T similar "
+                             f"(0-1, default when given: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only print per-meme results, not every pipeline step")
+    parser.add_argument("--metrics-log", metavar="FILE",
+                        help="append one JSON line per pipeline stage (timing and outcome) to FILE")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="keep FILE updated with metrics in the Prometheus text format")
+    args = parser.parse_args(argv)
+    try:
+        args.output = output_settings(args.format, args.quality, args.max_dimension)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.reuse_similar is not None and not 0 < args.reuse_similar <= 1:
+        parser.error("--reuse-similar must be between 0 and 1")
+    return args
 
 
 if __name__ == "__main__":
-    generate_batch_memes()
\ No newline at end of file
+    args = parse_args()
+    options = {"max_workers": args.workers, "cache": args.cache, "variants": args.variants,
+               "text_batch": max(1, args.text_batch), "render_workers": max(0, args.render_workers),
+               "output": args.output, "reuse_threshold": args.reuse_similar,
+               "verbose": not args.quiet, "metrics_log": args.metrics_log, "prometheus_path": args.prometheus}
+    if args.jobs:
+        generate_batch_from_jsonl(args.jobs, checkpoint_path=args.checkpoint, **options)
+    else:
+        generate_batch_memes(**options)
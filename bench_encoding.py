@@ -0,0 +1,72 @@
+"""
+Output encoding benchmark: file size and encode time of a captioned meme in every output format
+
+Usage:
+    python bench_encoding.py [--image PATH] [--repeat N] [--max-dimension PX]
+"""
+import argparse
+import io
+import sys
+import time
+
+from PIL import Image, ImageFilter
+
+from meme_forge import MemeForge
+from meme_encoding import OUTPUT_FORMATS, output_settings, encode, fit_dimension
+
+CAPTION = "When the deadline was tomorrow---But now it's in 30 minutes and the build is red"
+# Extra quality settings tried for the lossy formats, besides their defaults
+QUALITIES = {"webp": [60, 90], "jpeg": [70, 95]}
+
+
+def synthetic_base(size=(1024, 1024)):
+    """Smooth gradients plus soft texture, closer to a DALL-E illustration than flat colour or pure noise"""
+    red = Image.linear_gradient("L").resize(size)
+    green = Image.radial_gradient("L").resize(size)
+    blue = Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(3))
+    return Image.merge("RGB", [red, green, blue])
+
+
+def time_encode(img, output, repeat):
+    """(encoded bytes, mean encode seconds)"""
+    total = 0.0
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        encode(img, buffer, output)
+        total += time.perf_counter() - start
+    return len(buffer.getvalue()), total / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="base image to caption (default: a synthetic 1024x1024 illustration)")
+    parser.add_argument("--repeat", type=int, default=3, help="encodes per setting (default: 3)")
+    parser.add_argument("--max-dimension", type=int, action="append", metavar="PX",
+                        help="also measure with the base downscaled to PX (repeatable, e.g. 768)")
+    args = parser.parse_args()
+
+    base = MemeForge._open_base(args.image) if args.image else synthetic_base()
+    settings = []
+    for name in OUTPUT_FORMATS:
+        settings.append(output_settings(name))
+        settings.extend(output_settings(name, quality) for quality in QUALITIES.get(name, []))
+    for max_dimension in args.max_dimension or []:
+        settings.extend(output_settings(name, max_dimension=max_dimension) for name in ("png", "webp", "jpeg"))
+
+    print(f"Base: {args.image or 'synthetic'} ({base.width}x{base.height})")
+    print(f"{'format':<15} {'quality':>7} {'max px':>7} {'bytes':>10} {'vs png':>7} {'encode ms':>10}")
+    reference = None
+    for output in settings:
+        img = fit_dimension(base, output["max_dimension"]).copy()
+        MemeForge._draw_caption(img, CAPTION)
+        size, seconds = time_encode(img, output, args.repeat)
+        reference = reference or size
+        quality = output["quality"] or OUTPUT_FORMATS[output["format"]][1] or "-"
+        print(f"{output['format']:<15} {quality:>7} {output['max_dimension'] or '-':>7} {size:10d} "
+              f"{size / reference:6.0%} {seconds * 1000:10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Microbenchmark for meme caption overlay: legacy linear font fitting vs the cached/binary-search version
+
+Usage:
+    python bench_overlay.py [--repeat N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+import meme_forge
+from meme_forge import MemeForge
+
+# Typical DALL-E-3 output sizes
+IMAGE_SIZES = [(512, 512), (1024, 1024), (1792, 1024), (1024, 1792)]
+CAPTION = "When the deadline was tomorrow---But now it's in 30 minutes and the build is red"
+
+
+def legacy_overlay(image_path, meme_text):
+    """The original overlay_text_on_image: font re-parsed and a new ImageDraw per measurement"""
+    top_text, bottom_text = [line.strip() for line in meme_text.split('---', 1)]
+    img = Image.open(image_path).convert('RGB')
+    width, height = img.size
+
+    def load(size):
+        try:
+            return ImageFont.truetype(meme_forge.FONT_PATH, size=size)
+        except Exception:
+            return ImageFont.load_default(size=size)
+
+    def get_text_size(text, font):
+        text = text.upper()
+        bbox = ImageDraw.Draw(img).textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+    def fit_font(texts, max_width, initial_size):
+        size = initial_size
+        while size > 10:
+            font = load(size)
+            if all(get_text_size(t, font)[0] <= max_width for t in texts):
+                return font
+            size -= 2
+        return font
+
+    padding = int(height * 0.03)
+    font = fit_font([top_text, bottom_text], int(width * 0.95), int(height/11))
+
+    def draw_text(draw, text, y, font, outline=2):
+        text = text.upper()
+        w, h = get_text_size(text, font)
+        x = (width - w) / 2
+        for dx in range(-outline, outline+1):
+            for dy in range(-outline, outline+1):
+                if dx != 0 or dy != 0:
+                    draw.text((x+dx, y+dy), text, font=font, fill='black')
+        draw.text((x, y), text, font=font, fill='white')
+
+    img_rgba = img.convert('RGBA')
+    draw = ImageDraw.Draw(img_rgba)
+    draw_text(draw, top_text, padding, font)
+    _, h = get_text_size(bottom_text, font)
+    draw_text(draw, bottom_text, height - h - padding, font)
+    img_rgba.convert('RGB').save(image_path)
+    return image_path
+
+
+def clear_caches():
+    meme_forge._load_font.cache_clear()
+    meme_forge._text_size.cache_clear()
+
+
+def time_overlay(overlay, source, workdir, repeat):
+    """Mean seconds per overlay call; each call gets a fresh copy of the source image"""
+    total = 0.0
+    for i in range(repeat):
+        target = os.path.join(workdir, f"run_{i}.png")
+        shutil.copyfile(source, target)
+        start = time.perf_counter()
+        overlay(target, CAPTION)
+        total += time.perf_counter() - start
+    return total / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="overlay calls per image size (default: 5)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_overlay_")
+    # API clients are only built on first use, but the forge still creates
+    # static/generated relative to the working directory; keep that in workdir
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    forge = MemeForge(cache_dir=None, catalog_path=None, cleanup_journal=None, bases_dir=None, verbose=False)
+    try:
+        print(f"{'size':>10} {'legacy ms':>10} {'cold ms':>10} {'warm ms':>10} {'speedup':>8}")
+        for width, height in IMAGE_SIZES:
+            source = os.path.join(workdir, f"source_{width}x{height}.png")
+            Image.new('RGB', (width, height), (90, 120, 160)).save(source)
+            legacy = time_overlay(legacy_overlay, source, workdir, args.repeat)
+            clear_caches()
+            cold = time_overlay(forge.overlay_text_on_image, source, workdir, 1)
+            warm = time_overlay(forge.overlay_text_on_image, source, workdir, args.repeat)
+            print(f"{width}x{height:<5} {legacy * 1000:10.1f} {cold * 1000:10.1f} {warm * 1000:10.1f} "
+                  f"{legacy / warm:7.1f}x")
+    finally:
+        forge.close()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
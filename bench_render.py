@@ -0,0 +1,80 @@
+"""
+Bulk caption rendering throughput: threads in one process vs the multi-process render pool
+
+Usage:
+    python bench_render.py [--renders N] [--processes 1,2,4] [--size 1024x1024]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from meme_forge import MemeForge
+from meme_render import RenderPool
+
+CAPTION = "When the deadline was tomorrow---But now it's in 30 minutes and the build is red"
+
+
+def make_base(path, size):
+    """A noisy image, so decode/encode cost is close to a real DALL-E-3 base"""
+    Image.merge("RGB", [Image.effect_noise(size, 64) for _ in range(3)]).save(path)
+
+
+def run_threads(forge, base, outputs, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda path: forge.overlay_text_on_image(base, CAPTION, output_path=path), outputs))
+
+
+def run_pool(pool, base, outputs):
+    # Submitting blocks at max_pending, like downloads feeding a busy pool
+    futures = [pool.submit(base, [CAPTION], [path]) for path in outputs]
+    for future in futures:
+        future.result()
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=48, help="captions rendered per run (default: 48)")
+    parser.add_argument("--processes", default=",".join(str(n) for n in sorted({1, 2, 4, cores}) if n <= cores),
+                        help="comma-separated pool sizes to try (default: 1,2,4,... up to the core count)")
+    parser.add_argument("--size", default="1024x1024", help="base image size (default: 1024x1024)")
+    args = parser.parse_args()
+    size = tuple(int(n) for n in args.size.lower().split("x"))
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    forge = MemeForge(cache_dir=None, catalog_path=None, cleanup_journal=None, bases_dir=None, verbose=False)
+    try:
+        base = os.path.join(workdir, "base.png")
+        make_base(base, size)
+        outputs = [os.path.join(workdir, f"meme_{i:03d}.png") for i in range(args.renders)]
+        forge.overlay_text_on_image(base, CAPTION, output_path=outputs[0])  # warm fonts
+
+        print(f"{args.renders} renders of a {size[0]}x{size[1]} base on {cores} cores")
+        print(f"{'backend':<22} {'seconds':>8} {'renders/s':>10} {'speedup':>8}")
+        start = time.perf_counter()
+        run_threads(forge, base, outputs, cores)
+        threaded = time.perf_counter() - start
+        print(f"{f'{cores} threads':<22} {threaded:8.2f} {args.renders / threaded:10.1f} {1.0:7.1f}x")
+
+        for processes in (int(n) for n in args.processes.split(",")):
+            with RenderPool(processes) as pool:
+                pool.render(base, [CAPTION], outputs[:1])  # wait until the workers are up and warm
+                start = time.perf_counter()
+                run_pool(pool, base, outputs)
+                elapsed = time.perf_counter() - start
+            print(f"{f'pool, {processes} processes':<22} {elapsed:8.2f} {args.renders / elapsed:10.1f} "
+                  f"{threaded / elapsed:7.1f}x")
+    finally:
+        forge.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Startup benchmark: import and construction cost of the meme_forge entry points, with a regression guard
+
+Every scenario runs in a fresh interpreter. The run fails (exit code 1) when a
+scenario loads a heavy module it shouldn't need or exceeds its time budget.
+
+Usage:
+    python bench_startup.py [--repeat N] [--budget-scale X]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ["openai", "httpx", "requests", "PIL", "flask"]
+
+# name: (setup code, modules that must stay unloaded, in-process time budget in ms)
+SCENARIOS = {
+    "import meme_forge": ("import meme_forge", HEAVY_MODULES, 150),
+    "MemeForge()": ("from meme_forge import MemeForge\n"
+                    "MemeForge(verbose=False).close()", HEAVY_MODULES, 250),
+    "import batch_meme_generator": ("import batch_meme_generator", HEAVY_MODULES, 150),
+    "import view_memes": ("import view_memes", HEAVY_MODULES, 100),
+    "import meme_results": ("import meme_results", HEAVY_MODULES, 50),
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{setup}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_once(setup, workdir):
+    """Wall time of a fresh interpreter running setup, plus the in-process time and heavy modules it loaded"""
+    code = PROBE.format(setup=setup, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                                   os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall = (time.perf_counter() - start) * 1000
+    probe = json.loads(output.strip().splitlines()[-1])
+    return wall, probe["ms"], probe["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per scenario (default: 5)")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="multiply all time budgets, e.g. 2 on slow CI machines (default: 1)")
+    args = parser.parse_args()
+
+    # MemeForge() creates static/ folders relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    failures = []
+    try:
+        baseline = statistics.median(run_once("pass", workdir)[0] for _ in range(args.repeat))
+        print(f"Bare interpreter: {baseline:.1f} ms")
+        print(f"{'scenario':<30} {'in-process ms':>14} {'wall ms':>9} {'budget ms':>10}  heavy modules")
+        for name, (setup, forbidden, budget) in SCENARIOS.items():
+            runs = [run_once(setup, workdir) for _ in range(args.repeat)]
+            in_process = statistics.median(run[1] for run in runs)
+            wall = statistics.median(run[0] for run in runs)
+            loaded = sorted(set(module for run in runs for module in run[2]))
+            budget *= args.budget_scale
+            print(f"{name:<30} {in_process:14.1f} {wall:9.1f} {budget:10.0f}  {', '.join(loaded) or '-'}")
+            unexpected = [module for module in loaded if module in forbidden]
+            if unexpected:
+                failures.append(f"{name} imported {', '.join(unexpected)}")
+            if in_process > budget:
+                failures.append(f"{name} took {in_process:.0f} ms (budget {budget:.0f} ms)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("\n❌ Startup regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print("\n✅ Startup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
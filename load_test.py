@@ -0,0 +1,199 @@
+"""
+Load test for the meme pipeline against the mock DIAL server (or any DIAL-compatible endpoint)
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from meme_forge import MemeForge
+from meme_metrics import Metrics
+from meme_ratelimit import RateGovernor
+from mock_dial import MockDialServer, MockDialConfig, DEFAULT_LATENCY
+import batch_meme_generator
+
+SITUATIONS = batch_meme_generator.WORKPLACE_SITUATIONS
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers (p in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def _jobs(count):
+    # Numbered situations, so no two jobs share a cache key or output name
+    for i in range(count):
+        yield i, {"situation": f"{SITUATIONS[i % len(SITUATIONS)]} #{i}",
+                  "style": batch_meme_generator.DEFAULT_STYLE, "mood": batch_meme_generator.DEFAULT_MOOD}
+
+
+def run_closed_loop(forge, count, concurrency, engine="create", text_batch=batch_meme_generator.DEFAULT_TEXT_BATCH):
+    """Keep `concurrency` memes in flight until `count` are done; returns (latencies, failures)"""
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    if engine == "batch":
+        def on_result(i, job, result, error):
+            nonlocal failures
+            if error is None and result:
+                latencies.append(result["timings"]["total"])
+            else:
+                failures += 1
+
+        jobs = batch_meme_generator._with_batched_captions(forge, _jobs(count), text_batch, "bypass")
+        batch_meme_generator._run_jobs(forge, jobs, concurrency, "bypass", on_result)
+        return latencies, failures
+
+    def one(job):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            result = forge.create_meme(job["situation"], job["style"], job["mood"], concurrent=True, cache="bypass")
+        except Exception:
+            result = None
+        elapsed = time.perf_counter() - start
+        with lock:
+            if result:
+                latencies.append(elapsed)
+            else:
+                failures += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as executor:
+        list(executor.map(one, (job for _, job in _jobs(count))))
+    return latencies, failures
+
+
+def run_open_loop(forge, count, qps, max_in_flight):
+    """Start memes at a fixed rate regardless of completions; returns (latencies, failures)
+
+    Latency is measured from each meme's scheduled start, so time spent queued
+    behind a saturated pool counts (no coordinated omission).
+    """
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def one(job, scheduled):
+        nonlocal failures
+        try:
+            result = forge.create_meme(job["situation"], job["style"], job["mood"], concurrent=True, cache="bypass")
+        except Exception:
+            result = None
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            if result:
+                latencies.append(elapsed)
+            else:
+                failures += 1
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+        start = time.perf_counter()
+        for i, job in _jobs(count):
+            scheduled = start + i / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(one, job, scheduled)
+    return latencies, failures
+
+
+def _print_report(latencies, failures, elapsed, metrics, forge, server=None):
+    done = len(latencies)
+    print("=" * 50)
+    print(f"Memes: {done} ok, {failures} failed in {elapsed:.2f}s")
+    print(f"Throughput: {done / elapsed:.2f} memes/sec" if elapsed else "Throughput: n/a")
+    if latencies:
+        print(f"Latency: p50 {percentile(latencies, 50):.3f}s, p95 {percentile(latencies, 95):.3f}s, "
+              f"p99 {percentile(latencies, 99):.3f}s, max {max(latencies):.3f}s")
+    histograms = metrics.snapshot()["histograms"]
+    for series, h in sorted(histograms.items()):
+        if series.startswith("meme_stage_seconds") and h["count"]:
+            stage = series.split('stage="', 1)[1].split('"', 1)[0]
+            print(f"   {stage}: {h['mean']:.3f}s mean over {h['count']}")
+    governor_stats = forge.governor.stats()
+    print(f"Retries: {governor_stats['retries']} ({governor_stats['throttled']} throttled)")
+    if server is not None:
+        stats = server.stats()
+        print(f"Mock DIAL requests: {stats['requests']}, files left undeleted: {stats['files_stored']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure meme pipeline latency and throughput without spending quota")
+    parser.add_argument("--url", help="DIAL-compatible endpoint to use instead of an embedded mock server")
+    parser.add_argument("--requests", type=int, default=50, help="memes to generate (default: 50)")
+    parser.add_argument("--concurrency", type=int, default=8, help="memes in flight (closed loop, default: 8)")
+    parser.add_argument("--qps", type=float, help="start memes at this rate instead (open loop)")
+    parser.add_argument("--engine", choices=["create", "batch"], default="create",
+                        help="drive create_meme directly or through the batch engine (closed loop only)")
+    parser.add_argument("--text-batch", type=int, default=batch_meme_generator.DEFAULT_TEXT_BATCH, metavar="K",
+                        help="situations captioned per chat call with --engine batch")
+    parser.add_argument("--render-workers", type=int, default=0, metavar="N",
+                        help="draw captions in N worker processes (default: 0, on the calling thread)")
+    parser.add_argument("--unlimited", action="store_true",
+                        help="lift the client-side rate limits to measure the pipeline itself")
+    for endpoint, median in DEFAULT_LATENCY.items():
+        parser.add_argument(f"--{endpoint}-latency", type=float, default=median, metavar="SECONDS",
+                            help=f"mock median {endpoint} latency (default: {median})")
+    parser.add_argument("--sigma", type=float, default=0.5, help="mock log-normal latency spread")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock share of HTTP 500 answers")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="mock share of HTTP 429 answers")
+    parser.add_argument("--workdir", help="where memes are written (default: a temporary directory, removed after)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    if not args.url:
+        config = MockDialConfig(
+            latency={endpoint: getattr(args, f"{endpoint}_latency") for endpoint in DEFAULT_LATENCY},
+            sigma=args.sigma, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        )
+        server = MockDialServer(config=config).start()
+    url = args.url or server.url
+
+    # MemeForge writes under ./static, so run inside a scratch directory
+    workdir = args.workdir or tempfile.mkdtemp(prefix="meme_load_")
+    previous_cwd = os.getcwd()
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    metrics = Metrics()
+    limits = None
+    if args.unlimited:
+        limits = {model: (1e6, 1e6, 1024) for model in (MemeForge.TEXT_MODEL, MemeForge.IMAGE_MODEL)}
+    in_flight = args.concurrency if not args.qps else max(args.concurrency, 64)
+    governor = RateGovernor(limits=limits, metrics=metrics, log=lambda *args: None)
+    forge = MemeForge(pool_size=max(10, in_flight), base_url=url, cache_dir=None, catalog_path=None,
+                      metrics=metrics, verbose=False, rate_governor=governor,
+                      render_workers=args.render_workers)
+
+    mode = f"{args.qps} memes/sec" if args.qps else f"concurrency {args.concurrency} ({args.engine})"
+    print(f"🏋️ Load test: {args.requests} memes against {url}, {mode}")
+    try:
+        start = time.perf_counter()
+        if args.qps:
+            latencies, failures = run_open_loop(forge, args.requests, args.qps, in_flight)
+        else:
+            latencies, failures = run_closed_loop(forge, args.requests, args.concurrency, args.engine,
+                                                  max(1, args.text_batch))
+        elapsed = time.perf_counter() - start
+    finally:
+        # Closing drains the background DIAL cleanup, so the mock's leak count is final
+        forge.close()
+        os.chdir(previous_cwd)
+        if server is not None:
+            server.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    _print_report(latencies, failures, elapsed, metrics, forge, server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Content-addressed store of un-captioned base images, so memes can be re-captioned without DALL-E
+"""
+import os
+import time
+import hashlib
+import threading
+
+from meme_files import atomic_write
+
+BASES_DIR = "static/bases"
+
+
+class BaseImageStore:
+    """Keeps each downloaded base image once, as <sha256 of its bytes>.png.
+
+    Identical images (e.g. from the response cache or caption variants) share
+    one file. Files are written atomically and never modified afterwards.
+
+    When the store grows past max_bytes, bases that referenced(sha) says are
+    unused (e.g. no catalog row points at them) are evicted, least recently
+    stored first, down to 90% of the limit. Bases younger than grace seconds
+    are kept, since a meme being made right now hasn't been cataloged yet.
+    Referenced bases are never evicted, so a large library can stay above the
+    limit. max_bytes=None keeps every base forever.
+    """
+
+    def __init__(self, directory=BASES_DIR, max_bytes=None, referenced=None, grace=3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.referenced = referenced or (lambda sha: False)
+        self.grace = grace
+        self.evictions = 0
+        self._total_bytes = None  # computed lazily on first write
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, sha):
+        return os.path.join(self.directory, f"{sha}.png")
+
+    def exists(self, sha):
+        return os.path.exists(self.path(sha))
+
+    def put(self, data):
+        """Store image bytes unless an identical image is already stored; returns the sha256"""
+        sha = self.digest(data)
+        path = self.path(sha)
+        if os.path.exists(path):
+            # Storing it again counts as a use, so eviction goes least recently used first
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return sha
+        atomic_write(path, lambda f: f.write(data), prefix=".base_")
+        if self.max_bytes is not None:
+            with self._lock:
+                if self._total_bytes is None:
+                    self._total_bytes = sum(size for _, _, size, _ in self._entries())
+                else:
+                    self._total_bytes += len(data)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+        return sha
+
+    def get(self, sha):
+        """Stored bytes for sha, or None if there is no such base"""
+        try:
+            with open(self.path(sha), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _entries(self):
+        """(sha, path, size, mtime) of every stored base"""
+        for name in os.listdir(self.directory):
+            if name.startswith(".") or not name.endswith(".png"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield name[:-4], path, st.st_size, st.st_mtime
+
+    def _evict(self):
+        """Drop unreferenced bases, oldest first, until 90% of max_bytes (caller holds the lock)"""
+        entries = sorted(self._entries(), key=lambda entry: entry[3])
+        total = sum(size for _, _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        cutoff = time.time() - self.grace
+        for sha, path, size, mtime in entries:
+            if total <= target or mtime > cutoff:
+                break
+            if self.referenced(sha):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
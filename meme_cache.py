@@ -0,0 +1,134 @@
+"""
+On-disk, content-addressed cache for DIAL responses (meme text and base images)
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+from meme_files import atomic_write
+
+
+class ResponseCache:
+    """Stores response bytes under a hash of (kind, model, prompt, params).
+
+    Entries older than ttl seconds are treated as misses and removed. When the
+    cache grows past max_bytes the oldest entries are evicted first.
+    """
+
+    def __init__(self, directory="static/cache", max_bytes=1024 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._total_bytes = None  # computed lazily on first write
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind, model, prompt, params=None):
+        """Content address for a request: rendered prompt + model + generation parameters"""
+        material = json.dumps(
+            {"kind": kind, "model": model, "prompt": prompt, "params": params or {}},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return cached bytes for key, or None on a miss or expired entry"""
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if self.ttl is not None and age > self.ttl:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store bytes under key (atomic replace) and evict if over the size limit"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        atomic_write(path, lambda f: f.write(data))
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - old_size
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def get_text(self, key):
+        data = self.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_text(self, key, text):
+        self.put(key, text.encode("utf-8"))
+
+    def stats(self):
+        """Hit/miss counters for reporting"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith(".tmp_"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        """Drop expired entries, then oldest entries until 90% of max_bytes (caller holds the lock)"""
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, size, mtime in entries:
+            expired = self.ttl is not None and now - mtime > self.ttl
+            if not expired and total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
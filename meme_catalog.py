@@ -0,0 +1,216 @@
+"""
+SQLite catalog of generated memes, so viewers can query instead of rescanning static/generated
+"""
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+from meme_encoding import IMAGE_EXTENSIONS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memes (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    situation TEXT,
+    style TEXT,
+    mood TEXT,
+    caption TEXT,
+    size_bytes INTEGER,
+    width INTEGER,
+    height INTEGER,
+    timings TEXT,
+    mtime REAL,
+    created_at REAL,
+    base_sha TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_memes_created ON memes (created_at);
+CREATE INDEX IF NOT EXISTS idx_memes_mood ON memes (mood, created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _image_dimensions(path):
+    """(width, height) from the image header, or (None, None) if unreadable"""
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+class MemeCatalog:
+    """Index of meme files and their generation metadata.
+
+    Rows are written as memes are created (record) and can be brought in line
+    with the directory contents incrementally (reconcile): only new, changed or
+    deleted files are touched.
+    """
+
+    def __init__(self, db_path="static/catalog.db", directory="static/generated"):
+        self.db_path = db_path
+        self.directory = directory
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Catalogs created before base images were kept lack the link column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(memes)")}
+            if "base_sha" not in columns:
+                conn.execute("ALTER TABLE memes ADD COLUMN base_sha TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memes_base ON memes (base_sha)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this usable from any thread
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, path):
+        return os.path.normpath(path).replace(os.sep, "/")
+
+    def record(self, path, situation=None, style=None, mood=None, caption=None,
+               width=None, height=None, timings=None, created_at=None, base_sha=None):
+        """Insert or update the catalog row for a meme file that was just written
+
+        base_sha links the meme to its un-captioned image in the BaseImageStore.
+        """
+        st = os.stat(path)
+        if width is None or height is None:
+            width, height = _image_dimensions(path)
+        row = (
+            self._key(path), os.path.basename(path), situation, style, mood, caption,
+            st.st_size, width, height, json.dumps(timings) if timings else None,
+            st.st_mtime, created_at if created_at is not None else time.time(), base_sha,
+        )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO memes (path, filename, situation, style, mood, caption, size_bytes,"
+                " width, height, timings, mtime, created_at, base_sha)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def get(self, path):
+        """Catalog row for one meme file, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM memes WHERE path = ?", (self._key(path),)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def remove(self, path):
+        """Drop the row of a meme file that no longer exists"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM memes WHERE path = ?", (self._key(path),))
+
+    def references_base(self, sha):
+        """Whether any meme was rendered from the base image sha"""
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM memes WHERE base_sha = ? LIMIT 1", (sha,)).fetchone() is not None
+
+    def with_bases(self, mood=None, text=None):
+        """All memes that have a stored base image (optionally filtered), oldest first"""
+        clauses, params = ["base_sha IS NOT NULL"], []
+        if mood:
+            clauses.append("mood = ? COLLATE NOCASE")
+            params.append(mood)
+        if text:
+            clauses.append("(caption LIKE ? OR situation LIKE ? OR filename LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM memes WHERE {' AND '.join(clauses)} ORDER BY created_at",
+                                params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def reconcile(self, force=False):
+        """Sync the index with the directory; returns (added, updated, removed)
+
+        Skipped entirely when the directory hasn't changed since the last run,
+        unless force=True. Existing metadata is kept for files whose size and
+        mtime are unchanged.
+        """
+        if not os.path.isdir(self.directory):
+            return 0, 0, 0
+        dir_mtime = str(os.stat(self.directory).st_mtime_ns)
+        with self._connect() as conn:
+            last = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+            if not force and last is not None and last["value"] == dir_mtime:
+                return 0, 0, 0
+            known = {
+                r["path"]: (r["size_bytes"], r["mtime"])
+                for r in conn.execute("SELECT path, size_bytes, mtime FROM memes")
+            }
+            added = updated = 0
+            seen = set()
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith(IMAGE_EXTENSIONS):
+                        continue
+                    key = self._key(entry.path)
+                    seen.add(key)
+                    st = entry.stat()
+                    if known.get(key) == (st.st_size, st.st_mtime):
+                        continue
+                    width, height = _image_dimensions(entry.path)
+                    if key in known:
+                        conn.execute(
+                            "UPDATE memes SET size_bytes = ?, width = ?, height = ?, mtime = ? WHERE path = ?",
+                            (st.st_size, width, height, st.st_mtime, key),
+                        )
+                        updated += 1
+                    else:
+                        conn.execute(
+                            "INSERT INTO memes (path, filename, size_bytes, width, height, mtime, created_at)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, entry.name, st.st_size, width, height, st.st_mtime, st.st_mtime),
+                        )
+                        added += 1
+            missing = [path for path in known if path not in seen]
+            conn.executemany("DELETE FROM memes WHERE path = ?", [(path,) for path in missing])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime', ?)", (dir_mtime,))
+        return added, updated, len(missing)
+
+    def query(self, mood=None, text=None, limit=20, offset=0):
+        """Newest-first page of memes, optionally filtered by mood and/or a text search"""
+        clauses, params = [], []
+        if mood:
+            clauses.append("mood = ? COLLATE NOCASE")
+            params.append(mood)
+        if text:
+            clauses.append("(caption LIKE ? OR situation LIKE ? OR filename LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM memes {where} ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params + [limit, offset]).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def latest(self, limit=1, offset=0):
+        return self.query(limit=limit, offset=offset)
+
+    def by_mood(self, mood, limit=20, offset=0):
+        return self.query(mood=mood, limit=limit, offset=offset)
+
+    def search(self, text, limit=20, offset=0):
+        return self.query(text=text, limit=limit, offset=offset)
+
+    def count(self, mood=None):
+        with self._connect() as conn:
+            if mood:
+                return conn.execute("SELECT COUNT(*) FROM memes WHERE mood = ? COLLATE NOCASE", (mood,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM memes").fetchone()[0]
+
+    @staticmethod
+    def _row_to_dict(row):
+        meme = dict(row)
+        meme["timings"] = json.loads(meme["timings"]) if meme["timings"] else None
+        return meme
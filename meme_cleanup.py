@@ -0,0 +1,188 @@
+"""
+Background deletion of DIAL files: batched, retried, journaled to disk and drained on shutdown
+"""
+import os
+import json
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from meme_sequence import _FileLock
+from meme_files import atomic_write
+
+DEFAULT_JOURNAL_PATH = "static/.dial_cleanup.jsonl"
+
+
+class DialCleanupQueue:
+    """Deletes DIAL files on a worker thread so memes don't wait for the DELETE round trip.
+
+    delete(file_url) must remove one file and raise on failure. Files are
+    taken in batches of up to batch_size and each batch is deleted over
+    `workers` parallel requests; failures are retried with jittered
+    exponential backoff up to max_attempts. Every queued file is journaled
+    ({"op": "add"}) before it is accepted and marked {"op": "done"} once
+    deleted, so files still pending after a crash are picked up by the next
+    queue opened on the same journal. The journal may be shared by several
+    processes; it is only ever appended to or rewritten under a file lock.
+    """
+
+    def __init__(self, delete, journal_path=DEFAULT_JOURNAL_PATH, batch_size=16, workers=4, max_attempts=5,
+                 base_delay=1.0, max_delay=60.0, drain_timeout=15.0, metrics=None, log=print):
+        self.delete = delete
+        self.journal_path = journal_path
+        self.lock_path = journal_path + ".lock" if journal_path else None
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.drain_timeout = drain_timeout
+        self.metrics = metrics
+        self.log = log
+        self.deleted = 0
+        self.failed = 0
+        self._heap = []  # (due time, sequence, file_url, attempt)
+        self._sequence = 0
+        self._in_flight = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        if journal_path:
+            os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+            recovered = self._compact()
+            if recovered:
+                self.log(f"🧹 Resuming deletion of {len(recovered)} DIAL files left from an earlier run")
+            for file_url in recovered:
+                self._push(file_url, 0, time.monotonic())
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dial-delete")
+        self._worker = threading.Thread(target=self._run, name="dial-cleanup", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, file_url):
+        """Schedule a DIAL file for deletion; returns immediately"""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("cleanup queue is closed")
+        self._journal([{"op": "add", "url": file_url}])
+        with self._cond:
+            self._push(file_url, 0, time.monotonic())
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap) + self._in_flight
+
+    def stats(self):
+        with self._cond:
+            return {"pending": len(self._heap) + self._in_flight, "deleted": self.deleted, "failed": self.failed}
+
+    def close(self):
+        """Finish outstanding deletions (up to drain_timeout seconds); unfinished ones stay journaled"""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._drain_deadline = time.monotonic() + self.drain_timeout
+            self._cond.notify_all()
+        self._worker.join()
+        self._executor.shutdown()
+        left = self.pending()
+        if left:
+            self.log(f"⚠️  {left} DIAL files not deleted yet; they will be retried on the next run")
+        if self.journal_path:
+            self._compact()
+
+    def _push(self, file_url, attempt, due):
+        # Caller holds self._cond (or is still in __init__)
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, file_url, attempt))
+
+    def _take_batch(self):
+        """Wait for due files and pop up to batch_size of them; None once the queue is finished"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._closing and (not self._heap or now >= self._drain_deadline):
+                    return None
+                if self._heap and self._heap[0][0] <= now:
+                    batch = []
+                    while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                        _, _, file_url, attempt = heapq.heappop(self._heap)
+                        batch.append((file_url, attempt))
+                    self._in_flight += len(batch)
+                    return batch
+                timeout = self._heap[0][0] - now if self._heap else None
+                if self._closing:
+                    timeout = min(timeout, self._drain_deadline - now)
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            done, retry = [], []
+            errors = self._executor.map(self._delete_one, [file_url for file_url, _ in batch])
+            for (file_url, attempt), e in zip(batch, errors):
+                if e is None:
+                    done.append(file_url)
+                else:
+                    attempt += 1
+                    if attempt >= self.max_attempts:
+                        self.log(f"❌ Giving up on deleting DIAL file {file_url} for now: {e}")
+                        self.failed += 1
+                    else:
+                        retry.append((file_url, attempt))
+            if done:
+                try:
+                    self._journal([{"op": "done", "url": file_url} for file_url in done])
+                except OSError as e:
+                    self.log(f"Error updating cleanup journal: {e}")
+            with self._cond:
+                self._in_flight -= len(batch)
+                self.deleted += len(done)
+                now = time.monotonic()
+                for file_url, attempt in retry:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                    self._push(file_url, attempt, now + delay)
+
+    def _delete_one(self, file_url):
+        """Delete one file; returns the exception instead of raising it"""
+        try:
+            if self.metrics is not None:
+                with self.metrics.span("delete"):
+                    self.delete(file_url)
+            else:
+                self.delete(file_url)
+            return None
+        except Exception as e:
+            return e
+
+    def _journal(self, entries):
+        if not self.journal_path:
+            return
+        lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+        with _FileLock(self.lock_path):
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def _compact(self):
+        """Rewrite the journal with only undeleted files; returns their URLs"""
+        with _FileLock(self.lock_path):
+            pending = {}
+            try:
+                with open(self.journal_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # torn line from a crash
+                        if entry.get("op") == "add":
+                            pending[entry["url"]] = True
+                        elif entry.get("op") == "done":
+                            pending.pop(entry["url"], None)
+            except FileNotFoundError:
+                return []
+            lines = [json.dumps({"op": "add", "url": file_url}) + "\n" for file_url in pending]
+            atomic_write(self.journal_path, lambda f: f.writelines(lines), text=True, prefix=".dial_cleanup_")
+            return list(pending)
@@ -0,0 +1,79 @@
+"""
+Output encoding for finished memes: PNG (default, optimized or quantized), WebP and progressive JPEG
+"""
+
+# name: (file extension, default quality); quality only applies to the lossy formats
+OUTPUT_FORMATS = {
+    "png": (".png", None),            # Pillow defaults, as memes have always been written
+    "png-optimized": (".png", None),  # lossless, zlib level 9: ~10% smaller but >10x slower to encode
+    "png-quantized": (".png", None),  # 256-colour palette, typically 3-4x smaller
+    "webp": (".webp", 80),
+    "jpeg": (".jpg", 85),             # progressive, optimized Huffman tables
+}
+DEFAULT_OUTPUT = {"format": "png", "quality": None, "max_dimension": None}
+IMAGE_EXTENSIONS = tuple(sorted({extension for extension, _ in OUTPUT_FORMATS.values()}))
+
+
+def output_settings(format="png", quality=None, max_dimension=None):
+    """Validated output options as accepted by create_meme, the overlays and recaption
+
+    quality is 1-100 (WebP/JPEG only; None uses the format's default).
+    max_dimension downscales the base so its longer side is at most that many
+    pixels before the caption is drawn; None keeps the original size.
+    """
+    format = (format or "png").lower()
+    if format == "jpg":
+        format = "jpeg"
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format {format!r}, expected one of: {', '.join(OUTPUT_FORMATS)}")
+    try:
+        quality = int(quality) if quality is not None else None
+        max_dimension = int(max_dimension) if max_dimension is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("quality and max_dimension must be numbers")
+    if quality is not None and not 1 <= quality <= 100:
+        raise ValueError("quality must be between 1 and 100")
+    if max_dimension is not None and max_dimension < 64:
+        raise ValueError("max_dimension must be at least 64 pixels")
+    return {"format": format, "quality": quality, "max_dimension": max_dimension}
+
+
+def extension(output=None):
+    """File extension (".png", ".webp", ".jpg") for output settings"""
+    return OUTPUT_FORMATS[(output or DEFAULT_OUTPUT)["format"]][0]
+
+
+def format_for_path(path):
+    """Output format matching a file's extension ("png" for .png and anything unknown)"""
+    ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return {"webp": "webp", "jpg": "jpeg", "jpeg": "jpeg"}.get(ext, "png")
+
+
+def fit_dimension(img, max_dimension):
+    """img downscaled (aspect kept, Lanczos) so neither side exceeds max_dimension; never upscales"""
+    if not max_dimension or max(img.size) <= max_dimension:
+        return img
+    from PIL import Image
+    scale = max_dimension / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.LANCZOS)
+
+
+def encode(img, f, output=None):
+    """Write an RGB image to the binary file object f with the given output settings"""
+    from PIL import Image
+    output = output or DEFAULT_OUTPUT
+    name = output["format"]
+    quality = output.get("quality") or OUTPUT_FORMATS[name][1]
+    if name == "png":
+        img.save(f, format="PNG")
+    elif name == "png-optimized":
+        img.save(f, format="PNG", optimize=True)
+    elif name == "png-quantized":
+        img.quantize(colors=256, method=Image.FASTOCTREE).save(f, format="PNG", optimize=True)
+    elif name == "webp":
+        img.save(f, format="WEBP", quality=quality, method=4)
+    elif name == "jpeg":
+        img.save(f, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        raise ValueError(f"unknown output format {name!r}")
@@ -0,0 +1,40 @@
+"""
+Atomic file replacement with normal permissions, shared by everything that rewrites files others may be reading
+"""
+import os
+import tempfile
+
+
+def _read_umask():
+    # os.umask can only be read by setting it; done once at import, before worker threads start
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# What open(path, "w") would give a new file: 0o666 minus the process umask (0644 under umask 022)
+FILE_MODE = 0o666 & ~_read_umask()
+
+
+def atomic_write(path, write, text=False, prefix=".tmp_"):
+    """Write a file via a temp file in the same directory, then rename it over path
+
+    write(f) receives the open temp file (binary, or UTF-8 text with text=True).
+    Readers see either the old file or the complete new one, never a partial
+    write. The temp name ends in .tmp so directory scans for images skip it.
+    mkstemp creates files as 0600; the file gets FILE_MODE before it is
+    renamed, so web servers and exporters running as other users can read it.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") if text else os.fdopen(fd, "wb") as f:
+            write(f)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
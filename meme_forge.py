@@ -4,14 +4,118 @@ Combines LLM text generation with DALL-E image generation
 """
 import os
 import json
+import io
 import base64
-import requests
-from openai import AzureOpenAI
-from dotenv import load_dotenv
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
+from meme_files import atomic_write
+from meme_cache import ResponseCache
+from meme_sequence import SequenceAllocator
+from meme_catalog import MemeCatalog
+from meme_bases import BaseImageStore, BASES_DIR
+from meme_metrics import Metrics
+from meme_cleanup import DialCleanupQueue, DEFAULT_JOURNAL_PATH
+from meme_render import RenderPool
+from meme_similarity import SituationIndex
+from meme_encoding import DEFAULT_OUTPUT, output_settings, encode, extension, fit_dimension, format_for_path
+from meme_ratelimit import RateGovernor, RetryableError, CallCancelled, RETRYABLE_STATUS, parse_retry_after
 
 import re
 
+DEFAULT_BASE_URL = "https://ai-proxy.lab.epam.com"
+# Upper bound for caption variants per image (create_meme(variants=...))
+MAX_VARIANTS = 8
+# create_meme(cache=...): read and fill the response cache, skip the read but store, or neither
+CACHE_MODES = ("use", "refresh", "bypass")
+
+# Impact is the classic meme font; Pillow's bundled font is used where it's missing
+FONT_PATH = "C:/Windows/Fonts/impact.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/impact.ttf"
+_measure_draw = None
+
+
+@lru_cache(maxsize=128)
+def _load_font(font_path, size):
+    """Process-wide font cache: each (path, size) is parsed from disk only once"""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(font_path, size=size)
+    except Exception:
+        return ImageFont.load_default(size=size)
+
+
+@lru_cache(maxsize=4096)
+def _text_size(text, font_path, size):
+    """Measured (width, height) of text in the given font, memoized"""
+    global _measure_draw
+    from PIL import Image, ImageDraw
+    if _measure_draw is None:
+        # Measurements don't depend on the target image, so one scratch canvas serves all
+        _measure_draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    font = _load_font(font_path, size)
+    try:
+        bbox = _measure_draw.textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+    except AttributeError:
+        return _measure_draw.textsize(text, font=font)
+
+
+def _fit_font_size(texts, max_width, initial_size, font_path=FONT_PATH):
+    """Largest size (initial_size, initial_size-2, ... > 10) at which every text fits max_width
+
+    Text width grows with font size, so the candidates are binary-searched
+    instead of shrinking one step at a time. Falls back to the smallest
+    candidate when nothing fits, like the linear shrink did.
+    """
+    sizes = list(range(initial_size, 10, -2)) or [initial_size]
+    texts = [t.upper() for t in texts]
+
+    def fits(size):
+        return all(_text_size(t, font_path, size)[0] <= max_width for t in texts)
+
+    lo, hi = 0, len(sizes) - 1
+    best = hi
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if fits(sizes[mid]):
+            best = mid
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    return sizes[best]
+
+
+def _is_sha256(data):
+    """Whether a cache entry is a base store reference (64 hex digits) rather than image bytes"""
+    return len(data) == 64 and all(c in b"0123456789abcdef" for c in data)
+
+
+def _parse_batch_captions(content, expected_ids):
+    """{id: caption} from a batch reply: a JSON array of {"id", "caption"} objects
+
+    Tolerates a Markdown code fence or chatter around the array. Entries with
+    an unknown id or a caption that isn't "top---bottom" are dropped.
+    """
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("no JSON array in the reply")
+    entries = json.loads(content[start:end + 1])
+    expected = set(expected_ids)
+    captions = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or entry.get("id") not in expected:
+            continue
+        caption = entry.get("caption")
+        if not isinstance(caption, str) or "---" not in caption:
+            continue
+        top, bottom = (part.strip() for part in caption.split("---", 1))
+        if top and bottom:
+            captions[entry["id"]] = f"{top}---{bottom}"
+    return captions
+
+
 class MemeForge:
     @staticmethod
     def _sanitize_description(desc, maxlen=30):
@@ -21,18 +125,81 @@ class MemeForge:
         desc = re.sub(r'\s+', '_', desc)
         return desc[:maxlen].rstrip('_')
 
+    def overlay_text_on_image(self, image_path, meme_text, output_path=None, output=None):
+        """Overlay meme text (top and bottom) on the image in classic meme style: top at top, bottom at bottom.
+
+        image_path may also be raw image bytes or a file-like object, so a
+        downloaded image can be captioned without touching the disk first. The
+        result is encoded per output (see meme_encoding.output_settings;
+        default: the forge's output settings) and written atomically to
+        output_path, or into it when output_path is a writable binary file
+        object. output_path defaults to image_path, so it is required (else
+        ValueError) when image_path is bytes or a file object.
+        """
+        output = output or self.output
+        if output_path is None:
+            if not isinstance(image_path, (str, os.PathLike)):
+                raise ValueError("output_path is required when the image is given as bytes or a file object")
+            output_path = image_path
+        if self.render_workers and isinstance(output_path, (str, os.PathLike)):
+            return self.overlay_variants(image_path, [meme_text], [output_path], output=output)[0]
+        with self.metrics.span("overlay"):
+            output_path = self._render_caption(image_path, meme_text, output_path, output)
+        if isinstance(output_path, (str, os.PathLike)):
+            self.metrics.inc("bytes_written_total", os.path.getsize(output_path))
+        return output_path
+
+    def overlay_variants(self, image_path, meme_texts, output_paths, output=None):
+        """Render several captions over the same base image; returns the output paths
+
+        The base is decoded once and each caption is drawn on a copy of it, so N
+        variants cost one decode plus N draws and encodes. With render_workers
+        the work runs in the render pool and this call waits for it.
+        """
+        if len(meme_texts) != len(output_paths):
+            raise ValueError("need one output path per caption")
+        output = output or self.output
+        with self.metrics.span("overlay"):
+            if self.render_workers:
+                sizes = self.render_pool.render(image_path, meme_texts, output_paths, output)
+            else:
+                base = self._open_base(image_path, output["max_dimension"])
+                for meme_text, output_path in zip(meme_texts, output_paths):
+                    img = base.copy()
+                    self._draw_caption(img, meme_text)
+                    atomic_write(output_path, lambda f: encode(img, f, output))
+                sizes = [os.path.getsize(output_path) for output_path in output_paths]
+        for size in sizes:
+            self.metrics.inc("bytes_written_total", size)
+        return list(output_paths)
+
+    @staticmethod
+    def _open_base(image_path, max_dimension=None):
+        """Decode a base image (path, bytes or file-like object) to RGB, downscaled to max_dimension"""
+        from PIL import Image
+        if isinstance(image_path, (bytes, bytearray)):
+            image_path = io.BytesIO(image_path)
+        # Downscaling happens before the caption is drawn, so the text is sized
+        # for the final image and stays crisp
+        return fit_dimension(Image.open(image_path).convert('RGB'), max_dimension)
+
+    def _render_caption(self, image_path, meme_text, output_path, output=DEFAULT_OUTPUT):
+        if isinstance(image_path, (bytes, bytearray)):
+            image_path = io.BytesIO(image_path)
+        img = self._open_base(image_path, output["max_dimension"])
+        self._draw_caption(img, meme_text)
+
+        if isinstance(output_path, (str, os.PathLike)):
+            # Save image (atomically replaces the original when writing in place)
+            atomic_write(output_path, lambda f: encode(img, f, output))
+        else:
+            encode(img, output_path, output)
+        return output_path
+
     @staticmethod
-    def _get_next_seq_num(directory="static/generated"):  # returns int
-        existing = [f for f in os.listdir(directory) if f.startswith("meme_") and f.endswith(".png")]
-        nums = []
-        for fname in existing:
-            m = re.match(r"meme_(\d{3})_", fname)
-            if m:
-                nums.append(int(m.group(1)))
-        return max(nums, default=0) + 1
-    def overlay_text_on_image(self, image_path, meme_text):
-        """Overlay meme text (top and bottom) on the image in classic meme style: top at top, bottom at bottom."""
-        from PIL import Image, ImageDraw, ImageFont
+    def _draw_caption(img, meme_text):
+        """Draw the top/bottom caption onto an RGB image in place"""
+        from PIL import ImageDraw
         # Parse meme_text: expect two lines separated by '---'
         if '---' in meme_text:
             top_text, bottom_text = [line.strip() for line in meme_text.split('---', 1)]
@@ -42,60 +209,24 @@ class MemeForge:
             top_text = lines[0] if lines else meme_text
             bottom_text = lines[1] if len(lines) > 1 else ''
 
-        # Open image
-        img = Image.open(image_path).convert('RGB')
         width, height = img.size
 
-        # Try to use Impact or fallback to default
-        try:
-            font_path = "C:/Windows/Fonts/impact.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/impact.ttf"
-            font = ImageFont.truetype(font_path, size=int(height/11))
-        except Exception:
-            font = ImageFont.truetype(font=None, size=int(height/11)) if hasattr(ImageFont, 'truetype') else ImageFont.load_default()
-
-        # Helper to measure text size (Pillow >=10.0.0 uses textbbox)
-        def get_text_size(text, font):
-            text = text.upper()
-            try:
-                bbox = ImageDraw.Draw(img).textbbox((0, 0), text, font=font)
-                w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-            except AttributeError:
-                w, h = ImageDraw.Draw(img).textsize(text, font=font)
-            return w, h
-
-        # Dynamically fit font size to image width
-        def fit_font(texts, max_width, initial_size):
-            size = initial_size
-            while size > 10:
-                try:
-                    font_path = "C:/Windows/Fonts/impact.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/impact.ttf"
-                    font = ImageFont.truetype(font_path, size=size)
-                except Exception:
-                    font = ImageFont.truetype(font=None, size=size) if hasattr(ImageFont, 'truetype') else ImageFont.load_default()
-                if all(get_text_size(t, font)[0] <= max_width for t in texts):
-                    return font
-                size -= 2
-            return font
-
         padding = int(height * 0.03)
         max_text_width = int(width * 0.95)
-        font = fit_font([t for t in [top_text, bottom_text] if t], max_text_width, int(height/11))
+        # Dynamically fit font size to image width
+        size = _fit_font_size([t for t in [top_text, bottom_text] if t], max_text_width, int(height/11))
+        font = _load_font(FONT_PATH, size)
 
-        # Helper to draw outlined text
+        # Helper to draw outlined text: the outline is a native FreeType stroke,
+        # rendered in the same pass as the fill
         def draw_text(draw, text, y, font, outline=2):
             text = text.upper()
-            w, h = get_text_size(text, font)
+            w, h = _text_size(text, FONT_PATH, size)
             x = (width - w) / 2
-            # Draw outline
-            for dx in range(-outline, outline+1):
-                for dy in range(-outline, outline+1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x+dx, y+dy), text, font=font, fill='black')
-            # Draw main text
-            draw.text((x, y), text, font=font, fill='white')
+            draw.text((x, y), text, font=font, fill='white', stroke_width=outline, stroke_fill='black')
 
-        img_rgba = img.convert('RGBA')
-        draw = ImageDraw.Draw(img_rgba)
+        # Draw straight onto the RGB image; no RGBA round trip is needed
+        draw = ImageDraw.Draw(img)
 
         # Draw top text at the top
         if top_text:
@@ -104,33 +235,184 @@ class MemeForge:
 
         # Draw bottom text at the bottom
         if bottom_text:
-            _, h = get_text_size(bottom_text, font)
+            _, h = _text_size(bottom_text.upper(), FONT_PATH, size)
             y_bottom = height - h - padding
             draw_text(draw, bottom_text, y_bottom, font)
 
-        # Save image (overwrite original)
-        img_final = img_rgba.convert('RGB')
-        img_final.save(image_path)
-        return image_path
-    def __init__(self):
+    # Models and generation parameters; both are part of the response cache key
+    TEXT_MODEL = "gpt-4o"
+    TEXT_PARAMS = {"temperature": 0.8, "max_tokens": 100}
+    IMAGE_MODEL = "dall-e-3"
+    IMAGE_PARAMS = {}
+    # Rate governor gate for DIAL file downloads
+    FILES_GATE = "dial-files"
+
+    def __init__(self, pool_size=10, connect_timeout=10, read_timeout=120,
+                 cache_dir="static/cache", cache_max_bytes=1024 * 1024 * 1024, cache_ttl=7 * 24 * 3600,
+                 max_download_bytes=50 * 1024 * 1024, download_chunk_size=64 * 1024, download_timeout=180,
+                 catalog_path="static/catalog.db", rate_governor=None, metrics=None, verbose=True,
+                 base_url=None, cleanup_journal=DEFAULT_JOURNAL_PATH, bases_dir=BASES_DIR, render_workers=0,
+                 output_format="png", output_quality=None, max_dimension=None, reuse_threshold=None,
+                 bases_max_bytes=1024 * 1024 * 1024):
+        # verbose=False silences the progress prints; metrics still record everything
+        self.verbose = verbose
+        self.metrics = metrics or Metrics()
+        from dotenv import load_dotenv
         load_dotenv()
         # DIAL API configuration
         self.api_key = os.environ.get("AZURE_OPENAI_API_KEY", "XXX")
-        self.base_url = "https://ai-proxy.lab.epam.com"
+        # base_url (or DIAL_BASE_URL) points the forge at another endpoint, e.g. mock_dial.py
+        self.base_url = (base_url or os.environ.get("DIAL_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
         self.api_version = "2025-04-01-preview"
-        # Initialize Azure OpenAI client for text generation
-        self.client = AzureOpenAI(
-            api_key=self.api_key,
-            api_version=self.api_version,
-            azure_endpoint=self.base_url
-        )
+        # Connection layer: keep-alive pools sized for pool_size concurrent calls.
+        # requests.Session serves the DALL-E and file calls, the httpx client
+        # underneath AzureOpenAI serves chat completions; close() shuts down both.
+        # Both (and their imports) are built on first use, so overlay-only and
+        # CLI code paths don't pay for them.
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        # Image downloads are streamed in fixed-size chunks with a size cap and
+        # an overall deadline, so a stalled proxy can't hang a worker
+        self.max_download_bytes = max_download_bytes
+        self.download_chunk_size = download_chunk_size
+        self.download_timeout = download_timeout
+        self._session = None
+        self._client = None
+        self._prompt_templates = None
+        self._render_pool = None
+        self._cleanup = None
+        self._lazy_lock = threading.Lock()
+        # Token buckets, adaptive concurrency and retry/backoff per model; share
+        # one governor between forges that draw on the same quota
+        self.governor = rate_governor or RateGovernor(metrics=self.metrics, log=self._log)
         # Headers for DALL-E requests
         self.headers = {
             "api-key": self.api_key,
             "Content-Type": "application/json"
         }
-        # Load prompt templates from JSON file
-        self.prompt_templates = self._load_prompt_templates()
+        # Content-addressed response cache (cache_dir=None disables it). Cached
+        # base images are only a sha pointing into the base store, so
+        # cache_max_bytes bounds text and pointers; bases_max_bytes bounds images
+        self.cache = ResponseCache(cache_dir, max_bytes=cache_max_bytes, ttl=cache_ttl) if cache_dir else None
+        # Sequence numbers for meme_NNN_* file names, shared by threads and processes
+        self.sequence = SequenceAllocator("static/generated")
+        # Searchable index of finished memes (catalog_path=None disables it)
+        self.catalog = MemeCatalog(catalog_path, "static/generated") if catalog_path else None
+        # Un-captioned base images, deduplicated by content, for recaption()
+        # (bases_dir=None disables keeping them). Past bases_max_bytes, bases no
+        # cataloged meme uses are evicted; the ones memes use are kept for good
+        referenced = self.catalog.references_base if self.catalog is not None else None
+        self.bases = BaseImageStore(bases_dir, max_bytes=bases_max_bytes, referenced=referenced) if bases_dir else None
+        # DIAL files are deleted in the background; pending deletions survive a
+        # crash in cleanup_journal (None keeps them in memory only). The queue
+        # starts with the first deletion, so offline forges never resume them.
+        self.cleanup_journal = cleanup_journal
+        # Captions are drawn in render_workers worker processes (started on the
+        # first overlay); 0 renders on the calling thread
+        self.render_workers = render_workers
+        # How finished memes are encoded unless a call passes its own output settings
+        self.output = output_settings(output_format, output_quality, max_dimension)
+        # Situations at least reuse_threshold similar (same style and mood) reuse
+        # each other's stored base image instead of a new DALL-E-3 call; filled
+        # from the catalog on first use (None disables it)
+        self.similar = SituationIndex(reuse_threshold) if reuse_threshold and self.bases is not None else None
+        self._similar_loaded = False
+
+    def _log(self, *args):
+        """Progress output, unless the forge was created with verbose=False"""
+        if self.verbose:
+            print(*args)
+
+    @property
+    def session(self):
+        """Pooled requests.Session for DALL-E and file calls, created on first use"""
+        if self._session is None:
+            with self._lazy_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    @property
+    def client(self):
+        """Azure OpenAI client for text generation, created on first use"""
+        if self._client is None:
+            with self._lazy_lock:
+                if self._client is None:
+                    import httpx
+                    from openai import AzureOpenAI
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(max_connections=self.pool_size,
+                                            max_keepalive_connections=self.pool_size),
+                        timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    )
+                    self._client = AzureOpenAI(
+                        api_key=self.api_key,
+                        api_version=self.api_version,
+                        azure_endpoint=self.base_url,
+                        http_client=http_client,
+                        # Retries are handled by the rate governor, which also honors Retry-After
+                        max_retries=0
+                    )
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def render_pool(self):
+        """Process pool for caption rendering, started on first use"""
+        if self._render_pool is None:
+            with self._lazy_lock:
+                if self._render_pool is None:
+                    self._render_pool = RenderPool(self.render_workers, metrics=self.metrics)
+        return self._render_pool
+
+    @property
+    def cleanup(self):
+        """Background DIAL deletion queue, started (resuming journaled deletions) on first use"""
+        if self._cleanup is None:
+            with self._lazy_lock:
+                if self._cleanup is None:
+                    self._cleanup = DialCleanupQueue(self._delete_request, journal_path=self.cleanup_journal,
+                                                     metrics=self.metrics, log=self._log)
+        return self._cleanup
+
+    @property
+    def prompt_templates(self):
+        """Prompt templates from prompt_templates.json, loaded on first use"""
+        if self._prompt_templates is None:
+            self._prompt_templates = self._load_prompt_templates()
+        return self._prompt_templates
+
+    def close(self):
+        """Finish pending DIAL deletions, then close whichever HTTP clients and render workers were started"""
+        if self._cleanup is not None:
+            self._cleanup.close()
+        if self._render_pool is not None:
+            self._render_pool.close()
+        if self._session is not None:
+            self._session.close()
+        if self._client is not None:
+            self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _load_prompt_templates(self):
         """Load prompt templates from prompt_templates.json"""
@@ -139,38 +421,228 @@ class MemeForge:
             with open(template_path, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception as e:
-            print(f"Error loading prompt templates: {e}")
+            self._log(f"Error loading prompt templates: {e}")
             # Fallback to hardcoded templates if file missing
             return {
                 "text_prompt": {"template": "You are a professional meme creator specializing in workplace humor. Create meme text for this situation: '{situation_description}'\nStyle: {style}\nMood: {mood}\nFormat requirements:\n- Return ONLY two lines separated by ---\n- First line: setup/situation (1 line, concise)\n- Second line: punchline/funny twist (1 line, humorous)\n- Use classic meme style and internet culture references\n- Make it relatable for office workers\n- Maximum 40 characters per line\nExamples:\nInput: 'deadline moved up'\nOutput: When the deadline was tomorrow---\nBut now it's in 30 minutes\nInput: 'too many meetings'\nOutput: Another meeting that could've been---\nemail\n"},
                 "image_prompt": {"template": "You are a professional meme creator specializing in workplace humor.\nCreate a static meme image in style: '{style}' for this situation: '{situation_description}' and in mood '{mood}'.\nFormat requirements:\n- Do NOT add any text to the image.\n- Depict a funny office or workplace scenario (e.g. cubicles, coworkers, meetings, coffee, deadlines) that visually represents the situation.\n- Humor should be relatable, clever, and PG-rated.\n- Facial expressions and body language should enhance the joke.\nExamples:\nInput: 'deadline moved up'\n→ Office worker panicking as a clock speeds up\nInput: 'too many meetings'\n→ Bored employee on an endless video call\n"}
             }
     
-    def generate_meme_text(self, situation_description, style="cartoon/animation", mood="funny"):
-        """Generate meme text in strict two-line format for workplace humor, using user-specified style and mood"""
-        prompt_template = self.prompt_templates.get("text_prompt", {}).get("template", "")
-        prompt = prompt_template.format(situation_description=situation_description, style=style, mood=mood)
+    def _render_prompt(self, name, situation_description, style, mood):
+        """Fill the named template from prompt_templates.json"""
+        template = self.prompt_templates.get(name, {}).get("template", "")
+        return template.format(situation_description=situation_description, style=style, mood=mood)
+
+    def _cache_lookup(self, key, cache):
+        """Cached bytes for key unless the call bypasses or refreshes the cache"""
+        if self.cache is None or cache != "use":
+            return None
+        return self.cache.get(key)
+
+    def _cache_store(self, key, data, cache):
+        if self.cache is not None and cache != "bypass":
+            self.cache.put(key, data)
+
+    def _cached_image(self, key, cache):
+        """Cached base image bytes for key, or None
+
+        With a base store the cache entry is only the image's sha256 and the
+        bytes are read from static/bases; an entry whose base is gone is a miss.
+        """
+        data = self._cache_lookup(key, cache)
+        if data is None or not _is_sha256(data):
+            return data
+        return self.bases.get(data.decode("ascii")) if self.bases is not None else None
+
+    def _cache_image(self, key, image_data, cache="use", base_sha=None):
+        """Cache a downloaded base image under key: just its sha256 when it is kept in the base store"""
+        if self.bases is not None:
+            base_sha = base_sha or self._store_base(image_data)
+        self._cache_store(key, base_sha.encode("ascii") if base_sha else image_data, cache)
+
+    def _image_cache_key(self, situation_description, style, mood):
+        image_prompt = self._render_prompt("image_prompt", situation_description, style, mood)
+        return ResponseCache.make_key("image", self.IMAGE_MODEL, image_prompt, self.IMAGE_PARAMS)
+
+    def _chat_completion(self, prompt, n=1, max_tokens=None):
+        """One GPT-4o call (n > 1 asks for n alternative answers); transient failures are raised as RetryableError"""
+        import openai
+        params = dict(self.TEXT_PARAMS)
+        if n > 1:
+            params["n"] = n
+        if max_tokens:
+            params["max_tokens"] = max_tokens
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
+            return self.client.chat.completions.create(
+                model=self.TEXT_MODEL,
                 messages=[
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                temperature=0.8,
-                max_tokens=100
+                **params
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error generating meme text: {e}")
-            return None
+        except (openai.APIConnectionError, openai.APITimeoutError) as e:
+            raise RetryableError(str(e)) from e
+        except openai.APIStatusError as e:
+            if e.status_code not in RETRYABLE_STATUS:
+                raise
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            raise RetryableError(str(e), status_code=e.status_code, retry_after=retry_after) from e
+
+    def _post_image_request(self, payload):
+        """One DALL-E-3 call; returns the JSON body, raising RetryableError on transient failures"""
+        import requests
+        try:
+            response = self.session.post(
+                f"{self.base_url}/openai/deployments/{self.IMAGE_MODEL}/chat/completions?api-version={self.api_version}",
+                headers=self.headers,
+                json=payload,
+                timeout=self.timeout
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(str(e)) from e
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableError(
+                f"HTTP {response.status_code} from {self.IMAGE_MODEL}",
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After"))
+            )
+        response.raise_for_status()
+        return response.json()
+
+    def generate_meme_text(self, situation_description, style="cartoon/animation", mood="funny", cache="use",
+                           cancel=None):
+        """Generate meme text in strict two-line format for workplace humor, using user-specified style and mood
+
+        cache: "use" reads and fills the response cache, "refresh" skips the read
+        but stores the new answer, "bypass" does neither. Setting the cancel
+        event (threading.Event) stops the call before it is sent or retried.
+        """
+        prompt = self._render_prompt("text_prompt", situation_description, style, mood)
+        cache_key = ResponseCache.make_key("text", self.TEXT_MODEL, prompt, self.TEXT_PARAMS)
+        cached = self._cache_lookup(cache_key, cache)
+        if cached is not None:
+            return cached.decode("utf-8")
+        with self.metrics.span("text") as span:
+            try:
+                response = self.governor.call(self.TEXT_MODEL, lambda: self._chat_completion(prompt), cancel=cancel)
+                meme_text = response.choices[0].message.content.strip()
+            except CallCancelled:
+                span.status = "cancelled"
+                return None
+            except Exception as e:
+                span.fail()
+                self._log(f"Error generating meme text: {e}")
+                return None
+        self._cache_store(cache_key, meme_text.encode("utf-8"), cache)
+        return meme_text
     
-    def generate_meme_image(self, situation_description, meme_text, style="cartoon/animation", mood="funny"):
+    def generate_meme_captions(self, situation_description, style="cartoon/animation", mood="funny", n=3, cache="use",
+                               cancel=None):
+        """Generate up to n alternative captions for one situation with a single chat call
+
+        Uses the chat `n` parameter, so the prompt is sent (and billed) once.
+        Returns a list of distinct captions, which may be shorter than n when the
+        model repeats itself, or None on failure. n=1 is generate_meme_text.
+        """
+        if n <= 1:
+            meme_text = self.generate_meme_text(situation_description, style=style, mood=mood, cache=cache,
+                                                cancel=cancel)
+            return [meme_text] if meme_text else None
+        prompt = self._render_prompt("text_prompt", situation_description, style, mood)
+        cache_key = ResponseCache.make_key("text", self.TEXT_MODEL, prompt, dict(self.TEXT_PARAMS, n=n))
+        cached = self._cache_lookup(cache_key, cache)
+        if cached is not None:
+            return json.loads(cached.decode("utf-8"))
+        with self.metrics.span("text") as span:
+            try:
+                response = self.governor.call(self.TEXT_MODEL, lambda: self._chat_completion(prompt, n=n),
+                                              cancel=cancel)
+                captions = list(dict.fromkeys(
+                    choice.message.content.strip() for choice in response.choices if choice.message.content
+                ))
+                if not captions:
+                    raise ValueError("no captions in the response")
+            except CallCancelled:
+                span.status = "cancelled"
+                return None
+            except Exception as e:
+                span.fail()
+                self._log(f"Error generating meme captions: {e}")
+                return None
+        self._cache_store(cache_key, json.dumps(captions).encode("utf-8"), cache)
+        return captions
+
+    def generate_meme_texts(self, jobs, cache="use", fallback=True):
+        """Captions for several (situation, style, mood) jobs from one chat call
+
+        Jobs missing from the response cache are sent together as a JSON array
+        with the batch_text_prompt template, so the long instructions go out once
+        per batch instead of once per situation. A caption cached by
+        generate_meme_text is reused; batched captions come from a different
+        prompt, so they are cached under their own "text_batch" keys (template +
+        item) and never answer a generate_meme_text lookup. Items the reply
+        doesn't cover, or covers with a malformed caption, get a single
+        generate_meme_text call (or stay None with fallback=False). Returns a
+        list aligned with jobs.
+        """
+        jobs = list(jobs)
+        captions = [None] * len(jobs)
+        keys, pending = [], []
+        for i, (situation_description, style, mood) in enumerate(jobs):
+            prompt = self._render_prompt("text_prompt", situation_description, style, mood)
+            single_key = ResponseCache.make_key("text", self.TEXT_MODEL, prompt, self.TEXT_PARAMS)
+            keys.append(self._batch_text_cache_key(situation_description, style, mood))
+            cached = self._cache_lookup(single_key, cache) or self._cache_lookup(keys[-1], cache)
+            if cached is not None:
+                captions[i] = cached.decode("utf-8")
+            else:
+                pending.append(i)
+        if len(pending) > 1:
+            for i, caption in self._batch_text_request([(i, jobs[i]) for i in pending]).items():
+                captions[i] = caption
+                self._cache_store(keys[i], caption.encode("utf-8"), cache)
+        missing = [i for i in pending if captions[i] is None]
+        if missing:
+            self.metrics.inc("text_batch_fallbacks_total", len(missing))
+            if fallback:
+                for i in missing:
+                    captions[i] = self.generate_meme_text(*jobs[i], cache=cache)
+        return captions
+
+    def _batch_text_cache_key(self, situation_description, style, mood):
+        template = self.prompt_templates.get("batch_text_prompt", {}).get("template", "")
+        item = json.dumps({"situation": situation_description, "style": style, "mood": mood}, ensure_ascii=False)
+        return ResponseCache.make_key("text_batch", self.TEXT_MODEL, template + "\n" + item, self.TEXT_PARAMS)
+
+    def _batch_text_request(self, items):
+        """One chat call for [(id, (situation, style, mood))]; returns {id: caption} for the valid replies"""
+        template = self.prompt_templates.get("batch_text_prompt", {}).get("template")
+        if not template:
+            return {}
+        payload = [{"id": i, "situation": situation, "style": style, "mood": mood}
+                   for i, (situation, style, mood) in items]
+        prompt = template.format(items=json.dumps(payload, ensure_ascii=False))
+        # Each caption is two short lines plus a little JSON around it
+        max_tokens = self.TEXT_PARAMS.get("max_tokens", 100) * len(items) + 50
+        with self.metrics.span("text_batch") as span:
+            try:
+                response = self.governor.call(self.TEXT_MODEL,
+                                              lambda: self._chat_completion(prompt, max_tokens=max_tokens))
+                parsed = _parse_batch_captions(response.choices[0].message.content, [i for i, _ in items])
+            except Exception as e:
+                span.fail()
+                self._log(f"Error generating batched meme text: {e}")
+                return {}
+        self.metrics.inc("text_batch_items_total", len(parsed))
+        return parsed
+
+    def generate_meme_image(self, situation_description, meme_text, style="cartoon/animation", mood="funny",
+                            cancel=None):
         """Generate meme image using DALL-E-3 with user-specified style and mood, but instruct DALL-E to generate the scene ONLY, with NO text on the image. Text will be overlaid later."""
-        image_prompt_template = self.prompt_templates.get("image_prompt", {}).get("template", "")
-        image_prompt = image_prompt_template.format(situation_description=situation_description, style=style, mood=mood)
+        image_prompt = self._render_prompt("image_prompt", situation_description, style, mood)
         payload = {
             "messages": [
                 {
@@ -179,14 +651,19 @@ class MemeForge:
                 }
             ],
         }
+        with self.metrics.span("image") as span:
+            image_url = self._request_image(payload, cancel)
+            if not image_url:
+                span.status = "cancelled" if cancel is not None and cancel.is_set() else "error"
+        return image_url
+
+    def _request_image(self, payload, cancel=None):
+        """Run a DALL-E-3 request through the governor; returns the DIAL file URL or None"""
         try:
-            response = requests.post(
-                f"{self.base_url}/openai/deployments/dall-e-3/chat/completions?api-version={self.api_version}",
-                headers=self.headers,
-                json=payload
-            ).json()
+            response = self.governor.call(self.IMAGE_MODEL, lambda: self._post_image_request(payload),
+                                          cancel=cancel)
             if "choices" not in response:
-                print("Error in image generation response:", response)
+                self._log("Error in image generation response:", response)
                 return None
             image_data = response["choices"][0]["message"]["custom_content"]['attachments']
             image_url = ""
@@ -196,80 +673,455 @@ class MemeForge:
                     revised_prompt = item['data']
                 elif item['title'] == 'Image':
                     image_url = item['url']
-            print(f"Revised prompt: {revised_prompt}")
+            self._log(f"Revised prompt: {revised_prompt}")
             return image_url
+        except CallCancelled:
+            return None
         except Exception as e:
-            print(f"Error generating meme image: {e}")
+            self._log(f"Error generating meme image: {e}")
             return None
     
-    def download_image(self, image_url, situation_description=None, filename=None):
-        """Download generated image from DIAL, with custom filename if provided"""
+    def _allocate_image_path(self, situation_description=None, ext=".png"):
+        """Reserve the next sequential static/generated path for a meme"""
+        desc = self._sanitize_description(situation_description or "meme")
+        seq = self.sequence.next()
+        return os.path.join("static/generated", f"meme_{seq:03d}_{desc}{ext}")
+
+    def _stream_image(self, url, sink):
+        """Stream a DIAL file into sink chunk by chunk; returns the number of bytes written
+
+        The download runs through the rate governor, so a transient failure
+        (5xx, 429, dropped connection, truncated body) is retried instead of
+        losing an image that was already paid for. sink (a BytesIO or a file
+        opened for writing) is emptied before every attempt.
+        """
+        def attempt():
+            sink.seek(0)
+            sink.truncate()
+            return self._stream_image_chunks(url, sink)
+
+        with self.metrics.span("download"):
+            received = self.governor.call(self.FILES_GATE, attempt)
+        self.metrics.inc("bytes_downloaded_total", received)
+        return received
+
+    def _stream_image_chunks(self, url, sink):
+        """One download attempt; transient failures are raised as RetryableError"""
+        import requests
+        start = time.perf_counter()
+        received = 0
         try:
-            os.makedirs("static/generated", exist_ok=True)
-            if not filename:
-                # Use sequential numbering and sanitized description
-                seq = self._get_next_seq_num()
-                desc = self._sanitize_description(situation_description or "meme")
-                filename = f"meme_{seq:03d}_{desc}.png"
-            filepath = os.path.join("static/generated", filename)
+            with self.session.get(url, headers={"Api-Key": self.api_key}, stream=True,
+                                  timeout=self.timeout) as response:
+                if response.status_code in RETRYABLE_STATUS:
+                    raise RetryableError(
+                        f"HTTP {response.status_code} downloading {url}",
+                        status_code=response.status_code,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                response.raise_for_status()
+                expected = response.headers.get("Content-Length")
+                expected = int(expected) if expected and not response.headers.get("Content-Encoding") else None
+                if expected is not None and expected > self.max_download_bytes:
+                    raise ValueError(f"image is {expected} bytes, limit is {self.max_download_bytes}")
+                for chunk in response.iter_content(chunk_size=self.download_chunk_size):
+                    received += len(chunk)
+                    if received > self.max_download_bytes:
+                        raise ValueError(f"image exceeds the {self.max_download_bytes} byte limit")
+                    if time.perf_counter() - start > self.download_timeout:
+                        raise TimeoutError(f"download took longer than {self.download_timeout}s")
+                    sink.write(chunk)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            raise RetryableError(str(e)) from e
+        if expected is not None and received != expected:
+            raise RetryableError(f"incomplete download: got {received} of {expected} bytes")
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        self._log(f"Downloaded {received} bytes in {elapsed:.2f}s ({received / elapsed / 1024:.0f} KB/s)")
+        return received
 
+    def fetch_image(self, image_url, cache_key=None):
+        """Download a generated image from DIAL into memory and delete it from the server
+
+        Returns the image bytes, or None on failure. When cache_key is given the
+        base image is also cached (see _cache_image) so later runs can skip
+        DALL-E-3.
+        """
+        try:
             url = f"{self.base_url}/v1/{image_url}"
-            response = requests.get(url, headers={"Api-Key": self.api_key})
-            response.raise_for_status()
-            with open(filepath, "wb") as f:
-                f.write(response.content)
-            # Clean up from DIAL server
-            delete_response = requests.delete(url, headers={"Api-Key": self.api_key})
-            delete_response.raise_for_status()
-            print(f"Meme saved to: {filepath}")
+            buffer = io.BytesIO()
+            self._stream_image(url, buffer)
+            data = buffer.getvalue()
+            if cache_key:
+                self._cache_image(cache_key, data)
+            return data
+        except Exception as e:
+            self._log(f"Error downloading image: {e}")
+            return None
+        finally:
+            # Clean up from DIAL server, whether or not the download worked
+            self._delete_dial_file(image_url)
+
+    def download_image(self, image_url, situation_description=None, filename=None, cache_key=None):
+        """Download generated image from DIAL, with custom filename if provided
+
+        The response is streamed straight into the target file, so memory use
+        stays flat regardless of image size. If the forge's output settings
+        aren't plain PNG the image is downloaded into memory and re-encoded.
+        """
+        try:
+            if filename:
+                os.makedirs("static/generated", exist_ok=True)
+                filepath = os.path.join("static/generated", filename)
+            else:
+                filepath = self._allocate_image_path(situation_description, extension(self.output))
+            url = f"{self.base_url}/v1/{image_url}"
+            if self.output == DEFAULT_OUTPUT:
+                atomic_write(filepath, lambda f: self._stream_image(url, f))
+                if cache_key and self.cache is not None:
+                    with open(filepath, "rb") as f:
+                        self._cache_image(cache_key, f.read())
+            else:
+                buffer = io.BytesIO()
+                self._stream_image(url, buffer)
+                if cache_key:
+                    self._cache_image(cache_key, buffer.getvalue())
+                img = self._open_base(buffer, self.output["max_dimension"])
+                atomic_write(filepath, lambda f: encode(img, f, self.output))
+            self._log(f"Meme saved to: {filepath}")
             return filepath
         except Exception as e:
-            print(f"Error downloading image: {e}")
+            self._log(f"Error downloading image: {e}")
             return None
+        finally:
+            self._delete_dial_file(image_url)
     
-    def create_meme(self, situation_description, style="cartoon/animation", mood="funny"):
-        """Complete meme creation pipeline with text overlay and user-specified style/mood"""
-        print(f"🎨 Creating meme for: '{situation_description}'")
-        print("=" * 50)
-        print("📝 Generating meme text...")
-        meme_text = self.generate_meme_text(situation_description, style=style, mood=mood)
-        if not meme_text:
-            print("❌ Failed to generate meme text")
-            return None
-        print("✅ Meme text generated:")
-        print(meme_text)
-        print()
-        print("🖼️  Generating meme image...")
-        image_url = self.generate_meme_image(situation_description, meme_text, style=style, mood=mood)
-        if not image_url:
-            print("❌ Failed to generate meme image")
-            return None
-        print("✅ Meme image generated")
-        print("💾 Downloading meme...")
-        filepath = self.download_image(image_url, situation_description=situation_description)
-        if not filepath:
-            print("❌ Failed to download meme")
-            return None
-        print("✍️  Adding text to meme image...")
-        self.overlay_text_on_image(filepath, meme_text)
-        print("✅ Meme creation complete!")
-        return {
-            "text": meme_text,
-            "image_path": filepath,
+    def _delete_dial_file(self, image_url):
+        """Queue a generated file for deletion from the DIAL server"""
+        try:
+            self.cleanup.enqueue(image_url)
+        except Exception as e:
+            self._log(f"Error queueing DIAL file for deletion: {e}")
+
+    def _delete_request(self, image_url):
+        """One DELETE of a DIAL file (run by the cleanup queue); a file that is already gone counts as deleted"""
+        response = self.session.delete(f"{self.base_url}/v1/{image_url}", headers={"Api-Key": self.api_key},
+                                       timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def _discard_generated_image(self, image_future):
+        """Done-callback: delete the DIAL file of an image that is no longer needed"""
+        if image_future.cancelled() or image_future.exception() is not None:
+            return
+        if image_future.result():
+            self._delete_dial_file(image_future.result())
+
+    def _generate_text_and_image(self, situation_description, style, mood, cache="use", variants=1):
+        """Run text and image generation at the same time; returns (captions, image_url)
+
+        The image prompt only depends on situation/style/mood, so both model calls
+        can be in flight together. If either call fails the other is cancelled: a
+        call still waiting on the rate governor or on a retry is never sent, one
+        already sent has its result discarded, and an image that was generated
+        anyway is removed from DIAL.
+        """
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="meme-stage")
+        text_future = executor.submit(self.generate_meme_captions, situation_description, style=style, mood=mood,
+                                      n=variants, cache=cache, cancel=cancel)
+        image_future = executor.submit(self.generate_meme_image, situation_description, None, style=style, mood=mood,
+                                       cancel=cancel)
+        failed = None
+        try:
+            for future in as_completed([text_future, image_future]):
+                if future.exception() is not None or not future.result():
+                    failed = future
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if failed is None:
+            return text_future.result(), image_future.result()
+        cancel.set()
+        if failed is text_future:
+            self._log("❌ Failed to generate meme text")
+        else:
+            self._log("❌ Failed to generate meme image")
+        image_future.add_done_callback(self._discard_generated_image)
+        return None, None
+
+    def _find_similar(self, situation_description, style, mood):
+        """Near-duplicate lookup: (match, reservation) as from SituationIndex.lookup"""
+        if not self._similar_loaded:
+            with self._lazy_lock:
+                if not self._similar_loaded:
+                    seen = set()
+                    for meme in self.catalog.with_bases() if self.catalog is not None else []:
+                        # Caption variants and re-captions share one situation and base
+                        key = (meme["situation"], meme["style"], meme["mood"], meme["base_sha"])
+                        if meme["situation"] and key not in seen and self.bases.exists(meme["base_sha"]):
+                            seen.add(key)
+                            self.similar.add(*key)
+                    self._similar_loaded = True
+        match, reservation = self.similar.lookup(situation_description, style, mood, reserve=True)
+        self.metrics.inc("similar_lookups_total", result="hit" if match else "miss")
+        return match, reservation
+
+    def _record_in_catalog(self, filepath, situation_description, style, mood, meme_text, timings, base_sha=None):
+        """Add a finished meme to the catalog; a catalog failure never fails the meme"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.record(filepath, situation=situation_description, style=style, mood=mood,
+                                caption=meme_text, timings=timings, base_sha=base_sha)
+        except Exception as e:
+            self._log(f"Error updating meme catalog: {e}")
+
+    def create_meme(self, situation_description, style="cartoon/animation", mood="funny", concurrent=False, cache="use",
+                    variants=1, meme_text=None, output=None):
+        """Complete meme creation pipeline with text overlay and user-specified style/mood
+
+        With concurrent=True the GPT-4o and DALL-E-3 calls run in parallel, so the
+        wait is the slower of the two instead of their sum. cache is "use",
+        "refresh" or "bypass" (see generate_meme_text); a cached base image is
+        reused without any DALL-E-3 or download call.
+
+        variants > 1 asks for that many captions in one chat call and renders
+        each over the same base image (meme_NNN_<situation>_v1.png, _v2, ...).
+        The result's text/image_path are the first variant; all of them are
+        listed under "variants". A meme_text generated elsewhere (see
+        generate_meme_texts) skips the text stage. output (see
+        meme_encoding.output_settings) overrides the forge's format, quality
+        and maximum dimension for this meme.
+
+        With reuse_threshold set, a situation close enough to an earlier one
+        (see meme_similarity) gets that situation's base image and only a new
+        caption; its result names the situation under "similar_to".
+        """
+        variants = max(1, min(int(variants), MAX_VARIANTS))
+        result = None
+        reservation = None
+        try:
+            with self.metrics.span("pipeline") as span:
+                similar = None
+                if self.similar is not None and cache == "use":
+                    similar, reservation = self._find_similar(situation_description, style, mood)
+                result = self._create_meme(situation_description, style, mood, concurrent, cache, variants,
+                                           meme_text, output or self.output, similar)
+                if not result:
+                    span.fail()
+        finally:
+            if reservation is not None:
+                self.similar.finish(reservation, result.get("base_sha") if result else None)
+            self.metrics.inc("memes_total", status="ok" if result else "failed")
+        return result
+
+    def _create_meme(self, situation_description, style, mood, concurrent, cache, variants=1, meme_text=None,
+                     output=DEFAULT_OUTPUT, similar=None):
+        self._log(f"🎨 Creating meme for: '{situation_description}'")
+        self._log("=" * 50)
+        # Seconds spent per stage, stored with the meme in the catalog
+        timings = {}
+        started = stage_start = time.perf_counter()
+        image_key = self._image_cache_key(situation_description, style, mood)
+        cached_image = self._cached_image(image_key, cache)
+        if cached_image is None and similar is not None:
+            cached_image = self.bases.get(similar[1])
+            if cached_image is not None:
+                self._log(f"🔁 Near-duplicate of '{similar[0]}' ({similar[2]:.0%} similar)")
+            else:
+                similar = None
+        if meme_text:
+            # Caption was generated by the caller (e.g. a batched text call)
+            captions = [meme_text]
+            if cached_image is not None:
+                self._log("♻️  Reusing cached base image, skipping DALL-E-3")
+            else:
+                self._log("🖼️  Generating meme image...")
+                image_url = self.generate_meme_image(situation_description, meme_text, style=style, mood=mood)
+                if not image_url:
+                    self._log("❌ Failed to generate meme image")
+                    return None
+                self._log("✅ Meme image generated")
+                timings["image"] = time.perf_counter() - stage_start
+        elif cached_image is not None:
+            self._log("♻️  Reusing cached base image, skipping DALL-E-3")
+            self._log("📝 Generating meme text...")
+            captions = self.generate_meme_captions(situation_description, style=style, mood=mood,
+                                                   n=variants, cache=cache)
+            if not captions:
+                self._log("❌ Failed to generate meme text")
+                return None
+            self._log("✅ Meme text generated:")
+            self._log("\n".join(captions))
+            timings["text"] = time.perf_counter() - stage_start
+        elif concurrent:
+            self._log("📝🖼️  Generating meme text and image in parallel...")
+            captions, image_url = self._generate_text_and_image(situation_description, style, mood, cache=cache,
+                                                                variants=variants)
+            if not captions or not image_url:
+                return None
+            self._log("✅ Meme text generated:")
+            self._log("\n".join(captions))
+            self._log("✅ Meme image generated")
+            timings["text_and_image"] = time.perf_counter() - stage_start
+        else:
+            self._log("📝 Generating meme text...")
+            captions = self.generate_meme_captions(situation_description, style=style, mood=mood,
+                                                   n=variants, cache=cache)
+            if not captions:
+                self._log("❌ Failed to generate meme text")
+                return None
+            self._log("✅ Meme text generated:")
+            self._log("\n".join(captions))
+            self._log()
+            timings["text"] = time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
+            self._log("🖼️  Generating meme image...")
+            image_url = self.generate_meme_image(situation_description, captions[0], style=style, mood=mood)
+            if not image_url:
+                self._log("❌ Failed to generate meme image")
+                return None
+            self._log("✅ Meme image generated")
+            timings["image"] = time.perf_counter() - stage_start
+        if cached_image is not None:
+            image_data = cached_image
+        else:
+            stage_start = time.perf_counter()
+            self._log("💾 Downloading meme...")
+            image_data = self.fetch_image(image_url)
+            if image_data is None:
+                self._log("❌ Failed to download meme")
+                return None
+            timings["download"] = time.perf_counter() - stage_start
+        base_sha = self._store_base(image_data)
+        if cached_image is None:
+            # The bytes are already in the base store; the cache entry only points at them
+            self._cache_image(image_key, image_data, cache, base_sha)
+        # The downloaded bytes are captioned in memory and the final image is
+        # written once, so an un-captioned file never appears in static/generated
+        stage_start = time.perf_counter()
+        self._log("✍️  Adding text to meme image...")
+        filepath = self._allocate_image_path(situation_description, extension(output))
+        # Render workers read a stored base straight from disk instead of receiving the bytes
+        source = self.bases.path(base_sha) if base_sha and self.render_workers else image_data
+        if variants > 1:
+            # One sequence number for the whole set, so the variants sort together
+            stem, ext = os.path.splitext(filepath)
+            paths = [f"{stem}_v{k}{ext}" for k in range(1, len(captions) + 1)]
+            self.overlay_variants(source, captions, paths, output=output)
+        else:
+            paths = [self.overlay_text_on_image(source, captions[0], output_path=filepath, output=output)]
+        timings["overlay"] = time.perf_counter() - stage_start
+        timings["total"] = time.perf_counter() - started
+        for path, caption in zip(paths, captions):
+            self._log(f"Meme saved to: {path}")
+            self._record_in_catalog(path, situation_description, style, mood, caption, timings, base_sha)
+        self._log("✅ Meme creation complete!")
+        result = {
+            "text": captions[0],
+            "image_path": paths[0],
             "situation": situation_description,
             "style": style,
-            "mood": mood
+            "mood": mood,
+            "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()}
         }
+        if base_sha:
+            result["base_sha"] = base_sha
+        if similar is not None:
+            result["similar_to"] = similar[0]
+        if variants > 1:
+            result["variants"] = [{"text": caption, "image_path": path} for caption, path in zip(captions, paths)]
+        return result
+
+    def _store_base(self, image_data):
+        """Keep the un-captioned image; returns its sha256, or None if it isn't kept"""
+        if self.bases is None:
+            return None
+        try:
+            return self.bases.put(image_data)
+        except OSError as e:
+            self._log(f"Error storing base image: {e}")
+            return None
+
+    def recaption(self, meme_path, meme_text, output_path=None, output=None):
+        """Render new text over the stored base image of an existing meme; no API calls
+
+        Writes output_path (default: replaces meme_path) and updates the catalog
+        row, keeping the meme's situation/style/mood. Returns the path written, or
+        None if the meme has no stored base image. Without output the meme keeps
+        its format. When output selects another format, the default output path
+        takes that format's extension and the old file is removed, so a library
+        can be converted in place.
+        """
+        if self.catalog is None or self.bases is None:
+            self._log("Recaptioning needs the catalog and the base image store")
+            return None
+        meme = self.catalog.get(meme_path)
+        if not meme or not meme.get("base_sha") or not self.bases.exists(meme["base_sha"]):
+            self._log(f"No stored base image for {meme_path}")
+            return None
+        if output is None and extension(self.output) != os.path.splitext(meme_path)[1].lower():
+            output = output_settings(format_for_path(meme_path), max_dimension=self.output["max_dimension"])
+        output = output or self.output
+        replaced = None
+        if not output_path:
+            output_path = os.path.splitext(meme_path)[0] + extension(output)
+            if os.path.normpath(output_path) != os.path.normpath(meme_path):
+                replaced = meme_path
+        self.overlay_text_on_image(self.bases.path(meme["base_sha"]), meme_text, output_path=output_path,
+                                   output=output)
+        self._record_in_catalog(output_path, meme["situation"], meme["style"], meme["mood"], meme_text,
+                                meme["timings"], meme["base_sha"])
+        if replaced:
+            try:
+                os.remove(replaced)
+            except OSError as e:
+                self._log(f"Error removing {replaced}: {e}")
+            self.catalog.remove(replaced)
+        return output_path
+
+    def recaption_many(self, items, workers=None, output=None):
+        """recaption() for many (meme_path, meme_text) pairs on a thread pool; returns paths (None on failure)
 
+        With render_workers the threads only feed the render pool, so by default
+        there are enough of them to keep every render slot busy.
+        """
+        items = list(items)
+        if not workers:
+            workers = self.render_pool.max_pending if self.render_workers else min(8, os.cpu_count() or 1)
 
-def main():
+        def one(item):
+            try:
+                return self.recaption(*item, output=output)
+            except Exception as e:
+                self._log(f"Error recaptioning {item[0]}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recaption") as executor:
+            return list(executor.map(one, items))
+
+
+def main(argv=None):
     """Main CLI interface"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate workplace memes interactively")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", dest="cache", action="store_const", const="bypass", default="use",
+                             help="ignore the response cache and don't store new responses")
+    cache_group.add_argument("--refresh-cache", dest="cache", action="store_const", const="refresh",
+                             help="regenerate every meme and overwrite cached responses")
+    args = parser.parse_args(argv)
+
     print("🔥 Welcome to Meme Forge MVP! 🔥")
     print("AI-powered workplace meme generator")
     print("=" * 40)
     
-    forge = MemeForge()
-    
+    with MemeForge() as forge:
+        _interactive_loop(forge, cache=args.cache)
+
+
+def _interactive_loop(forge, cache="use"):
+    """Prompt for situations until the user quits"""
     while True:
         print("\nDescribe your work situation for a meme:")
         print("(or type 'quit' to exit)")
@@ -290,7 +1142,7 @@ def main():
             mood = "funny"
 
         try:
-            result = forge.create_meme(situation, style=style, mood=mood)
+            result = forge.create_meme(situation, style=style, mood=mood, concurrent=True, cache=cache)
             if result:
                 print(f"\n🎉 Your meme is ready!")
                 print(f"Text: {result['text']}")
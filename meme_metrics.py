@@ -0,0 +1,193 @@
+"""
+Lightweight metrics for the meme pipeline: stage spans, latency histograms, counters and exporters
+"""
+import sys
+import json
+import time
+import os
+import threading
+from contextlib import contextmanager
+
+from meme_files import atomic_write
+
+# Histogram bucket upper bounds in seconds (model calls take seconds, overlays milliseconds)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HELP = {
+    "meme_stage_seconds": "Time spent in each meme pipeline stage",
+    "meme_stage_total": "Pipeline stage runs by outcome",
+    "memes_total": "Memes finished by outcome",
+    "dial_retries_total": "Retried DIAL model calls",
+    "dial_throttled_total": "DIAL calls rejected with HTTP 429",
+    "bytes_downloaded_total": "Image bytes downloaded from DIAL",
+    "bytes_written_total": "Encoded meme bytes written to disk",
+    "text_batch_items_total": "Captions returned by batched text calls",
+    "text_batch_fallbacks_total": "Batched captions missing or malformed in the reply",
+    "render_backpressure_total": "Overlays that waited for a free render worker slot",
+    "similar_lookups_total": "Near-duplicate situation lookups by result",
+}
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Span:
+    """Handle for a running span; call fail() when the stage failed without raising"""
+
+    def __init__(self, name):
+        self.name = name
+        self.status = "ok"
+        self.seconds = None
+
+    def fail(self):
+        self.status = "error"
+
+
+class JsonLinesExporter:
+    """Writes one JSON object per event (finished span, counter increment) to a stream or file"""
+
+    def __init__(self, target=None):
+        if target is None:
+            self._stream, self._owned = sys.stderr, False
+        elif isinstance(target, str):
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            self._stream, self._owned = open(target, "a", encoding="utf-8"), True
+        else:
+            self._stream, self._owned = target, False
+        self._lock = threading.Lock()
+
+    def export(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def close(self):
+        if self._owned:
+            self._stream.close()
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms with pluggable event exporters"""
+
+    def __init__(self, exporters=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.exporters = list(exporters or [])
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def _emit(self, event):
+        for exporter in self.exporters:
+            try:
+                exporter.export(event)
+            except Exception as e:
+                print(f"Error exporting metrics: {e}")
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        if self.exporters:
+            self._emit({"ts": time.time(), "type": "counter", "name": name, "value": value, **labels})
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram(self.buckets)
+            self._histograms[key].observe(value)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Time a pipeline stage into meme_stage_seconds and count it by outcome"""
+        span = Span(stage)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            span.seconds = time.perf_counter() - start
+            self.observe("meme_stage_seconds", span.seconds, stage=stage, **labels)
+            key = ("meme_stage_total", tuple(sorted(dict(labels, stage=stage, status=span.status).items())))
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0) + 1
+            if self.exporters:
+                self._emit({"ts": time.time(), "type": "span", "stage": stage,
+                            "seconds": round(span.seconds, 6), "status": span.status, **labels})
+
+    def snapshot(self):
+        """Plain-dict copy of all counters and histogram summaries"""
+        with self._lock:
+            counters = {self._series(name, labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                self._series(name, labels): {"count": h.count, "sum": h.sum,
+                                             "mean": h.sum / h.count if h.count else 0.0}
+                for (name, labels), h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    @classmethod
+    def _series(cls, name, labels):
+        return name + cls._labels(labels)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    seen.add(name)
+                    if name in HELP:
+                        lines.append(f"# HELP {name} {HELP[name]}")
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), h in histograms:
+                if name not in seen:
+                    seen.add(name)
+                    if name in HELP:
+                        lines.append(f"# HELP {name} {HELP[name]}")
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{self._labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically write the Prometheus text to path (for node_exporter's textfile collector)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        text = self.render_prometheus()
+        atomic_write(path, lambda f: f.write(text), text=True, prefix=".metrics_")
@@ -0,0 +1,184 @@
+"""
+Client-side rate governor for DIAL model calls: token buckets, adaptive concurrency and retries
+"""
+import time
+import random
+import threading
+
+# Per-model (requests per second, burst, max concurrent calls); tune to the DIAL quota
+DEFAULT_LIMITS = {
+    "gpt-4o": (5.0, 10, 16),
+    "dall-e-3": (1.0, 2, 4),
+    # File downloads from DIAL storage; loose limits, they are mostly here for the retries
+    "dial-files": (20.0, 40, 32),
+}
+FALLBACK_LIMIT = (2.0, 4, 4)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """A call failed in a way worth retrying (throttling, transient server or network error)"""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self):
+        return self.status_code == 429
+
+
+class CallCancelled(Exception):
+    """The caller's cancel event was set before the call (or its next retry) went out"""
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight calls: halves on throttling, grows back by ~1 per window of successes"""
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class RateGovernor:
+    """Shared gate for model calls: every call goes through call(model, fn).
+
+    Calls wait for a token from the model's bucket and a slot under its
+    adaptive concurrency limit. A RetryableError is retried with full-jitter
+    exponential backoff (or the server's Retry-After) until max_retries or
+    max_total_wait seconds are used up, after which it is raised. Retries and
+    throttled calls are counted in `metrics` (a meme_metrics.Metrics) when given.
+    A call given a cancel event (threading.Event) raises CallCancelled instead of
+    sending a request or retry once the event is set.
+    """
+
+    def __init__(self, limits=None, max_retries=5, base_delay=1.0, max_delay=30.0, max_total_wait=120.0,
+                 metrics=None, log=print):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_wait = max_total_wait
+        self.metrics = metrics
+        self.log = log
+        self.retries = 0
+        self.throttled = 0
+        self._buckets = {}
+        self._concurrency = {}
+        self._lock = threading.Lock()
+
+    def _gates(self, model):
+        with self._lock:
+            if model not in self._buckets:
+                rate, burst, max_concurrency = self.limits.get(model, FALLBACK_LIMIT)
+                self._buckets[model] = TokenBucket(rate, burst)
+                self._concurrency[model] = AdaptiveConcurrency(max_concurrency)
+            return self._buckets[model], self._concurrency[model]
+
+    def backoff(self, attempt, retry_after=None):
+        """Delay before retry number `attempt` (0-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_total_wait)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, model, fn, cancel=None):
+        bucket, concurrency = self._gates(model)
+        deadline = time.monotonic() + self.max_total_wait
+        attempt = 0
+        while True:
+            bucket.acquire()
+            concurrency.acquire()
+            throttled = False
+            try:
+                # Checked after the gates, which can hold a call back for a while
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled(f"{model} call cancelled")
+                return fn()
+            except RetryableError as e:
+                throttled = e.throttled
+                error = e
+            finally:
+                concurrency.release(throttled=throttled)
+            with self._lock:
+                self.throttled += int(throttled)
+            if throttled and self.metrics is not None:
+                self.metrics.inc("dial_throttled_total", model=model)
+            delay = self.backoff(attempt, error.retry_after)
+            if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                raise error
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            if self.metrics is not None:
+                self.metrics.inc("dial_retries_total", model=model)
+            self.log(f"⏳ {model} call failed ({error}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                raise CallCancelled(f"{model} call cancelled")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "concurrency_limits": {model: int(c.limit) for model, c in self._concurrency.items()},
+            }
@@ -0,0 +1,137 @@
+"""
+Caption rendering on a pool of worker processes, so bulk overlays use every core instead of sharing one GIL
+"""
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Rendered once per worker at startup so fonts, text measurements and the PNG
+# encoder are loaded before the first real job (typical DALL-E-3 sizes)
+WARM_SIZES = [(1024, 1024), (1792, 1024), (1024, 1792)]
+WARM_CAPTION = "When the deadline was tomorrow---But now it's in 30 minutes"
+
+
+def _warm_worker():
+    """Worker initializer: draw and encode a caption at every common size"""
+    from PIL import Image
+    from meme_forge import MemeForge
+    for size in WARM_SIZES:
+        img = Image.new('RGB', size)
+        MemeForge._draw_caption(img, WARM_CAPTION)
+        img.save(io.BytesIO(), format="PNG")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _read_shared(name, size):
+    """Copy an encoded image out of a shared memory block created by the parent"""
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[:size])
+    finally:
+        block.close()
+
+
+def _render_job(source, meme_texts, output_paths, output=None):
+    """Worker side: decode the base once, draw each caption and write it; returns the sizes written
+
+    source is a file path or ("shm", name, size) for bytes handed over in shared memory.
+    output holds the encoder settings (see meme_encoding.output_settings).
+    """
+    from meme_forge import MemeForge
+    from meme_files import atomic_write
+    from meme_encoding import DEFAULT_OUTPUT, encode
+    output = output or DEFAULT_OUTPUT
+    if isinstance(source, tuple):
+        source = _read_shared(*source[1:])
+    base = MemeForge._open_base(source, output["max_dimension"])
+    sizes = []
+    for meme_text, output_path in zip(meme_texts, output_paths):
+        img = base.copy() if len(output_paths) > 1 else base
+        MemeForge._draw_caption(img, meme_text)
+        atomic_write(output_path, lambda f: encode(img, f, output))
+        sizes.append(os.path.getsize(output_path))
+    return sizes
+
+
+class RenderPool:
+    """Renders captions on `processes` worker processes (default: one per core).
+
+    Base images never travel as pickled PIL images: a path is passed as is
+    (made absolute; the worker reads the file itself) and raw bytes go through a shared
+    memory block that is freed once the job finishes. At most max_pending
+    jobs (default: 2 per process) are queued or running; submit() blocks
+    beyond that, so the threads feeding the pool - downloads, re-captions -
+    can't run ahead of rendering and pile up images in memory.
+    """
+
+    def __init__(self, processes=None, max_pending=None, metrics=None):
+        import multiprocessing
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.processes
+        self.metrics = metrics
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # spawn, not fork: the parent runs HTTP and cleanup threads that a fork would copy mid-flight
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_warm_worker,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        # Start (and warm) every worker now instead of one per early job
+        for _ in range(self.processes):
+            self._executor.submit(_ping)
+
+    def submit(self, source, meme_texts, output_paths, output=None):
+        """Queue one base image with its captions; returns a Future of the sizes written
+
+        source is a path, bytes or a file-like object; output the encoder
+        settings. Blocks while max_pending jobs are in flight.
+        """
+        if not self._slots.acquire(blocking=False):
+            if self.metrics is not None:
+                self.metrics.inc("render_backpressure_total")
+            self._slots.acquire()
+        block = None
+        try:
+            if hasattr(source, "read"):
+                source = source.read()
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                block = self._share(source)
+                source = ("shm", block.name, len(source))
+            else:
+                source = os.path.abspath(source)
+            # Absolute paths: a worker's working directory is wherever the parent was when it spawned
+            future = self._executor.submit(_render_job, source, list(meme_texts),
+                                           [os.path.abspath(path) for path in output_paths], output)
+        except BaseException:
+            self._release(block)
+            raise
+        future.add_done_callback(lambda _: self._release(block))
+        return future
+
+    def render(self, source, meme_texts, output_paths, output=None):
+        """submit() and wait; returns the sizes written"""
+        return self.submit(source, meme_texts, output_paths, output).result()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _share(data):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        return block
+
+    def _release(self, block):
+        if block is not None:
+            block.close()
+            block.unlink()
+        self._slots.release()
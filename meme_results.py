@@ -0,0 +1,180 @@
+"""
+Append-only results log for batch runs, plus compaction into batch_summary.json
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+from meme_files import atomic_write
+
+DEFAULT_LOG_PATH = "static/generated/batch_results.jsonl"
+DEFAULT_SUMMARY_PATH = "static/generated/batch_summary.json"
+
+
+class ResultsLog:
+    """One JSON line per finished meme, written as soon as the meme is done.
+
+    Lines are flushed immediately (so `tail -f` shows progress) and fsynced in
+    batches: every fsync_every records or fsync_interval seconds, whichever
+    comes first. A crash loses at most that many unsynced records.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH, truncate=False, fsync_every=10, fsync_interval=2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "w" if truncate else "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_records(path):
+    """Yield records from a results log, skipping a torn last line left by a crash"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def is_success(record):
+    # Records without a status predate status tracking and only logged successes
+    return record.get("status", "ok") == "ok"
+
+
+def finished_ids(path):
+    """IDs of jobs that completed successfully according to the log"""
+    return {record["id"] for record in read_records(path) if is_success(record) and "id" in record}
+
+
+class FinishedIndex:
+    """finished_ids() for resuming long runs: the IDs go into a temporary on-disk
+    SQLite table instead of a set, so memory stays flat however many jobs the
+    log records. Supports `job_id in index` and len(); close() deletes it.
+    """
+
+    def __init__(self, path):
+        # "" opens a private temporary database file that SQLite removes on close
+        self._db = sqlite3.connect("", check_same_thread=False)
+        self._db.execute("CREATE TABLE finished (id TEXT PRIMARY KEY)")
+        self._db.executemany("INSERT OR IGNORE INTO finished VALUES (?)",
+                             ((str(record["id"]),) for record in read_records(path)
+                              if is_success(record) and "id" in record))
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM finished").fetchone()[0]
+
+    def __contains__(self, job_id):
+        return self._db.execute("SELECT 1 FROM finished WHERE id = ?", (str(job_id),)).fetchone() is not None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def progress(path):
+    """Counts and mean stage timings from a (possibly still growing) results log"""
+    counts = {"ok": 0, "failed": 0}
+    timing_totals = {}
+    for record in read_records(path):
+        if is_success(record):
+            counts["ok"] += 1
+            for stage, seconds in (record.get("timings") or {}).items():
+                timing_totals[stage] = timing_totals.get(stage, 0.0) + seconds
+        else:
+            counts["failed"] += 1
+    mean_timings = {stage: total / counts["ok"] for stage, total in timing_totals.items()} if counts["ok"] else {}
+    return {**counts, "mean_timings": mean_timings}
+
+
+def compact(log_path=DEFAULT_LOG_PATH, summary_path=DEFAULT_SUMMARY_PATH):
+    """Rebuild the aggregate batch_summary.json (input order) from a results log; returns its totals"""
+    memes, failed = [], 0
+    for record in read_records(log_path):
+        if is_success(record):
+            memes.append(record)
+        else:
+            failed += 1
+    memes.sort(key=lambda record: record.get("index", 0))
+    summary = {
+        "total_generated": len(memes),
+        "total_requested": len(memes) + failed,
+        "total_failed": failed,
+        "memes": [
+            {key: value for key, value in record.items() if key not in ("status", "error", "index")}
+            for record in memes
+        ],
+    }
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    atomic_write(summary_path, lambda f: json.dump(summary, f, indent=2), text=True, prefix=".summary_")
+    return {key: summary[key] for key in ("total_generated", "total_requested", "total_failed")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show progress of a batch results log or compact it into a summary")
+    parser.add_argument("log", nargs="?", default=DEFAULT_LOG_PATH, help=f"results log (default: {DEFAULT_LOG_PATH})")
+    parser.add_argument("--compact", metavar="SUMMARY", nargs="?", const=DEFAULT_SUMMARY_PATH,
+                        help=f"write the aggregate summary (default: {DEFAULT_SUMMARY_PATH})")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        print(f"No results log at {args.log}")
+        return 1
+    stats = progress(args.log)
+    print(f"✅ {stats['ok']} generated, ❌ {stats['failed']} failed")
+    for stage, seconds in sorted(stats["mean_timings"].items()):
+        print(f"   {stage}: {seconds:.2f}s mean")
+    if args.compact:
+        totals = compact(args.log, args.compact)
+        print(f"Summary saved to: {args.compact} ({totals['total_generated']} memes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Persistent meme sequence numbers, safe across threads and processes
+"""
+import os
+import re
+import threading
+
+from meme_files import atomic_write
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# meme_001_..., meme_1000_... (three digits minimum, more once past 999); the
+# 8-digit dates of older meme_YYYYMMDD_HHMMSS.png files are not sequence numbers
+SEQ_PATTERN = re.compile(r"meme_(\d{3,7})_")
+
+
+class _FileLock:
+    """Exclusive OS-level lock on a lock file (blocks until acquired)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.name == 'nt':
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if os.name == 'nt':
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SequenceAllocator:
+    """Hands out increasing sequence numbers backed by a counter file.
+
+    The counter is seeded once from the highest existing meme_NNN_*.png in the
+    directory; after that each allocation is a locked read-increment-write of
+    the counter, independent of how many files the directory holds.
+    """
+
+    def __init__(self, directory="static/generated", counter_name=".meme_seq"):
+        self.directory = directory
+        self.counter_path = os.path.join(directory, counter_name)
+        self.lock_path = self.counter_path + ".lock"
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _scan_highest(self):
+        """Highest sequence number among existing meme files (one-time seed)"""
+        highest = 0
+        for name in os.listdir(self.directory):
+            m = SEQ_PATTERN.match(name)
+            if m:
+                highest = max(highest, int(m.group(1)))
+        return highest
+
+    def _read_counter(self):
+        try:
+            with open(self.counter_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _write_counter(self, value):
+        atomic_write(self.counter_path, lambda f: f.write(str(value)), text=True, prefix=".meme_seq_")
+
+    def next(self):
+        """Allocate and return the next sequence number"""
+        with self._lock, _FileLock(self.lock_path):
+            current = self._read_counter()
+            if current is None:
+                current = self._scan_highest()
+            value = current + 1
+            self._write_counter(value)
+            return value
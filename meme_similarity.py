@@ -0,0 +1,171 @@
+"""
+Near-duplicate detection for meme situations: MinHash signatures over character shingles, indexed with LSH
+"""
+import re
+import struct
+import hashlib
+import threading
+
+NUM_PERM = 64
+# 16 bands of 4 rows: situations at Jaccard 0.7 share a band ~99% of the time, at 0.3 ~12%
+BANDS = 16
+SHINGLE_SIZE = 4
+DEFAULT_THRESHOLD = 0.7
+# Filler words that change between phrasings of the same situation
+STOPWORDS = frozenset(
+    "a an the when you your youre i im me my we our us is are was be been to of on in at for and or but so "
+    "that this it its just".split()
+)
+
+
+def normalize(text):
+    """Lowercase, alphanumerics only (as in MemeForge._sanitize_description), filler words dropped"""
+    text = re.sub(r"[^a-z0-9\s]", "", text.lower())
+    return " ".join(word for word in text.split() if word not in STOPWORDS)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character n-grams of the normalized text"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM values), or None for text with nothing to compare
+
+    Each shingle is hashed once with SHAKE-128 into NUM_PERM independent 32-bit
+    values; the signature is the column-wise minimum.
+    """
+    grams = shingles(text)
+    if not grams:
+        return None
+    rows = (struct.unpack(f"<{NUM_PERM}I", hashlib.shake_128(gram.encode("utf-8")).digest(4 * NUM_PERM))
+            for gram in grams)
+    return tuple(min(column) for column in zip(*rows))
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class SituationIndex:
+    """In-memory LSH index from situations to the base images generated for them.
+
+    Only situations with the same style and mood are compared, since both go
+    into the image prompt. lookup() returns the most similar indexed
+    situation at or above threshold. With reserve=True a miss is entered as
+    in progress: concurrent lookups that match it wait for its image instead
+    of generating their own, and the caller must call finish() with the
+    resulting base image (or None if generation failed).
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, wait_timeout=300):
+        self.threshold = threshold
+        self.wait_timeout = wait_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # id -> entry dict
+        self._buckets = {}  # (style, mood, band, rows) -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, situation, style, mood, base_sha):
+        """Index a situation whose base image is already stored"""
+        sig = signature(situation)
+        if sig is None:
+            return
+        with self._lock:
+            entry_id = self._insert(sig, situation, style, mood, base_sha)
+            self._entries[entry_id]["ready"].set()
+
+    def lookup(self, situation, style, mood, reserve=False):
+        """(match, reservation): match is (situation, base_sha, similarity) or None
+
+        reservation is only returned for a miss with reserve=True.
+        """
+        sig = signature(situation)
+        if sig is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        stalled = set()
+        while True:
+            with self._lock:
+                best = self._best(sig, style, mood, stalled)
+                if best is None:
+                    self.misses += 1
+                    return None, (self._insert(sig, situation, style, mood, None) if reserve else None)
+                entry, score = best
+                if entry["base_sha"] is not None:
+                    self.hits += 1
+                    return (entry["situation"], entry["base_sha"], score), None
+            # A matching situation is still being generated; use its image once it's
+            # there (a failed one is dropped from the index, a stalled one skipped)
+            if not entry["ready"].wait(self.wait_timeout):
+                stalled.add(entry["id"])
+
+    def finish(self, reservation, base_sha):
+        """Complete a reservation: index its base image, or drop it when generation failed"""
+        with self._lock:
+            entry = self._entries.get(reservation)
+            if entry is None:
+                return
+            if base_sha:
+                entry["base_sha"] = base_sha
+            else:
+                self._remove(entry)
+        entry["ready"].set()
+
+    def stats(self):
+        """Hit/miss counters for reporting"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "indexed": len(self._entries),
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _keys(self, sig, style, mood):
+        rows = NUM_PERM // BANDS
+        return [(style, mood, band, sig[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+    def _insert(self, sig, situation, style, mood, base_sha):
+        # Caller holds self._lock
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = {"id": entry_id, "signature": sig, "situation": situation, "style": style,
+                                   "mood": mood, "base_sha": base_sha, "ready": threading.Event()}
+        for key in self._keys(sig, style, mood):
+            self._buckets.setdefault(key, set()).add(entry_id)
+        return entry_id
+
+    def _remove(self, entry):
+        # Caller holds self._lock
+        del self._entries[entry["id"]]
+        for key in self._keys(entry["signature"], entry["style"], entry["mood"]):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry["id"])
+                if not bucket:
+                    del self._buckets[key]
+
+    def _best(self, sig, style, mood, skip):
+        """Most similar candidate at or above threshold, preferring finished entries; (entry, score) or None"""
+        candidates = set()
+        for key in self._keys(sig, style, mood):
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for entry_id in candidates - skip:
+            entry = self._entries[entry_id]
+            score = similarity(sig, entry["signature"])
+            if score < self.threshold:
+                continue
+            rank = (entry["base_sha"] is not None, score)
+            if best is None or rank > best[0]:
+                best = (rank, entry, score)
+        return best[1:] if best else None
@@ -0,0 +1,85 @@
+"""
+Thumbnail cache and contact sheets for browsing generated memes without decoding originals
+"""
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from meme_files import atomic_write
+
+THUMBNAIL_DIR = "static/thumbnails"
+THUMBNAIL_SIZE = 256
+
+
+def _source_dir(source, size, cache_dir):
+    """Stable per-source, per-size directory: every cached version of one thumbnail lives in it"""
+    digest = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}_{size}")
+
+
+def thumbnail_path(source, size=THUMBNAIL_SIZE, cache_dir=THUMBNAIL_DIR):
+    """Cache path for the current version of source (keyed by its mtime and byte size)"""
+    st = os.stat(source)
+    return os.path.join(_source_dir(source, size, cache_dir), f"{st.st_mtime_ns}_{st.st_size}.jpg")
+
+
+def get_thumbnail(source, size=THUMBNAIL_SIZE, cache_dir=THUMBNAIL_DIR):
+    """Path to a downscaled preview of source, generated on first use
+
+    A source that changed since its thumbnail was made gets a new cache key, and
+    the outdated thumbnails for it are removed. Only that source's own cache
+    directory is scanned, so a miss costs the same however many thumbnails
+    are cached.
+    """
+    path = thumbnail_path(source, size, cache_dir)
+    if os.path.exists(path):
+        return path
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    from PIL import Image
+    with Image.open(source) as img:
+        # Lets JPEG sources decode at reduced scale; a no-op for PNG
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        atomic_write(path, lambda f: img.save(f, format="JPEG", quality=85), prefix=".thumb_")
+    for name in os.listdir(directory):
+        # Dot files are other threads' thumbnails still being written
+        if not name.startswith(".") and os.path.join(directory, name) != path:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return path
+
+
+def contact_sheet(sources, output_path, columns=5, size=THUMBNAIL_SIZE, cache_dir=THUMBNAIL_DIR,
+                  workers=None, padding=8, background=(24, 24, 24)):
+    """Tile thumbnails of sources into one image at output_path; returns output_path
+
+    Thumbnails are produced by a thread pool (Pillow releases the GIL while
+    decoding and resizing), so only thumbnails that are missing or stale cost a
+    full-size decode.
+    """
+    sources = list(sources)
+    if not sources:
+        raise ValueError("no images to put on the contact sheet")
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        thumbnails = list(executor.map(lambda source: get_thumbnail(source, size, cache_dir), sources))
+
+    columns = max(1, min(columns, len(thumbnails)))
+    rows = (len(thumbnails) + columns - 1) // columns
+    cell = size + padding
+    from PIL import Image
+    sheet = Image.new("RGB", (columns * cell + padding, rows * cell + padding), background)
+    for i, thumb_path in enumerate(thumbnails):
+        with Image.open(thumb_path) as thumb:
+            row, col = divmod(i, columns)
+            # Center each thumbnail in its cell (non-square images are smaller on one side)
+            x = padding + col * cell + (size - thumb.width) // 2
+            y = padding + row * cell + (size - thumb.height) // 2
+            sheet.paste(thumb, (x, y))
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    sheet.save(output_path)
+    return output_path
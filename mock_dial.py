@@ -0,0 +1,274 @@
+"""
+Offline stand-in for the DIAL endpoints used by MemeForge: GPT-4o chat, DALL-E-3 attachments, file GET and DELETE
+"""
+import io
+import json
+import math
+import re
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+# Median response time in seconds per endpoint; real DIAL is roughly text ~1.5s, image ~10s
+DEFAULT_LATENCY = {"text": 0.5, "image": 2.0, "file": 0.02, "delete": 0.01}
+
+MOCK_CAPTIONS = [
+    "WHEN THE BUILD IS GREEN---BUT NOBODY KNOWS WHY",
+    "ONE DOES NOT SIMPLY---DEPLOY ON FRIDAY",
+    "ME EXPLAINING THE BUG---THE BUG WAS ME",
+    "IT WORKS ON MY MACHINE---SHIP THE MACHINE",
+    "QUICK CHANGE THEY SAID---THREE SPRINTS AGO",
+    "MEETING AT 9AM---COULD HAVE BEEN AN EMAIL",
+    "FIXED ONE BUG---SPAWNED THREE MORE",
+    "LEGACY CODE---NOBODY DARES TO TOUCH IT",
+]
+
+
+class LatencyModel:
+    """Log-normal response times: `median` seconds, spread by `sigma` (0 = constant)"""
+
+    def __init__(self, median, sigma=0.5, max_seconds=None):
+        self.median = median
+        self.sigma = sigma
+        self.max_seconds = max_seconds
+
+    def sample(self):
+        if self.median <= 0:
+            return 0.0
+        seconds = self.median * math.exp(random.gauss(0, self.sigma)) if self.sigma else self.median
+        return min(seconds, self.max_seconds) if self.max_seconds else seconds
+
+
+class MockDialConfig:
+    """Latency per endpoint plus the share of calls that fail with 500 or are throttled with 429"""
+
+    def __init__(self, latency=None, sigma=0.5, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 image_size=(1024, 1024)):
+        medians = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.latency = {endpoint: LatencyModel(median, sigma) for endpoint, median in medians.items()}
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.image_size = image_size
+
+
+def _noise_png(size):
+    """A noisy PNG, so downloads are about as large as real DALL-E images"""
+    img = Image.merge("RGB", [Image.effect_noise(size, 64) for _ in range(3)])
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class MockDialServer:
+    """Threaded HTTP server speaking just enough of the DIAL API for MemeForge
+
+    Images are kept in memory until DELETEd, so `stats()["files_stored"]`
+    shows files the client failed to clean up.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.config = config or MockDialConfig()
+        self.image_bytes = _noise_png(self.config.image_size)
+        self.files = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-dial", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.counts), "files_stored": len(self.files)}
+
+    def store_image(self):
+        file_id = f"files/mock/{uuid.uuid4().hex}.png"
+        with self._lock:
+            self.files[file_id] = self.image_bytes
+        return file_id
+
+
+def _handler_for(dial):
+    config = dial.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _injected_failure(self, endpoint):
+            """Sleep for the endpoint's latency, then maybe answer 429/500; True if a failure was sent"""
+            time.sleep(config.latency[endpoint].sample())
+            roll = random.random()
+            if roll < config.throttle_rate:
+                dial.count(f"{endpoint}_429")
+                self._send_json(429, {"error": {"message": "Too many requests"}},
+                                {"Retry-After": str(config.retry_after)})
+                return True
+            if roll < config.throttle_rate + config.error_rate:
+                dial.count(f"{endpoint}_500")
+                self._send_json(500, {"error": {"message": "Injected server error"}})
+                return True
+            return False
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.split("?", 1)[0]
+            if not (path.startswith("/openai/deployments/") and path.endswith("/chat/completions")):
+                return self._send_json(404, {"error": {"message": f"no route for {path}"}})
+            model = path[len("/openai/deployments/"):-len("/chat/completions")]
+            if model == "dall-e-3":
+                return self._image(body)
+            return self._chat(model, body)
+
+        def _chat(self, model, body):
+            dial.count("text")
+            if self._injected_failure("text"):
+                return
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            batch_ids = re.findall(r'\{"id": (\d+)', prompt)
+            if batch_ids:
+                # batch_text_prompt: answer with a JSON array of captions
+                content = json.dumps([{"id": int(i), "caption": random.choice(MOCK_CAPTIONS)} for i in batch_ids])
+                return self._send_json(200, self._completion(model, [content]))
+            n = min(int(body.get("n") or 1), len(MOCK_CAPTIONS))
+            self._send_json(200, self._completion(model, random.sample(MOCK_CAPTIONS, n)))
+
+        def _completion(self, model, contents):
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": i,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                } for i, content in enumerate(contents)],
+                "usage": {"prompt_tokens": 50, "completion_tokens": 12 * len(contents), "total_tokens": 62},
+            }
+
+        def _image(self, body):
+            dial.count("image")
+            if self._injected_failure("image"):
+                return
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            self._send_json(200, {
+                "choices": [{
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": "",
+                        "custom_content": {"attachments": [
+                            {"title": "Revised prompt", "data": prompt[:200]},
+                            {"title": "Image", "type": "image/png", "url": dial.store_image()},
+                        ]},
+                    },
+                    "finish_reason": "stop",
+                }],
+            })
+
+        def _file_id(self):
+            path = self.path.split("?", 1)[0]
+            return path[len("/v1/"):] if path.startswith("/v1/") else None
+
+        def do_GET(self):
+            dial.count("file")
+            file_id = self._file_id()
+            with dial._lock:
+                data = dial.files.get(file_id)
+            if data is None:
+                return self._send_json(404, {"error": {"message": "file not found"}})
+            if self._injected_failure("file"):
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_DELETE(self):
+            dial.count("delete")
+            time.sleep(config.latency["delete"].sample())
+            with dial._lock:
+                found = dial.files.pop(self._file_id(), None) is not None
+            self._send_json(200 if found else 404, {} if found else {"error": {"message": "file not found"}})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the DIAL endpoints used by MemeForge")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for endpoint, median in DEFAULT_LATENCY.items():
+        parser.add_argument(f"--{endpoint}-latency", type=float, default=median, metavar="SECONDS",
+                            help=f"median {endpoint} response time (default: {median})")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal latency spread, 0 for constant (default: 0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of calls answered with HTTP 429")
+    args = parser.parse_args()
+
+    config = MockDialConfig(
+        latency={endpoint: getattr(args, f"{endpoint}_latency") for endpoint in DEFAULT_LATENCY},
+        sigma=args.sigma, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+    )
+    server = MockDialServer(args.host, args.port, config)
+    print(f"🧪 Mock DIAL listening on {server.url}")
+    print(f"Point MemeForge at it with DIAL_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {server.stats()['requests']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Re-caption memes over their stored base images - no DALL-E-3 calls, no network
+
+Usage:
+    python recaption.py static/generated/meme_012_friday_deploy.png "New top---New bottom" [--output PATH]
+    python recaption.py --jsonl fixes.jsonl        # lines of {"path": ..., "caption": ...}
+    python recaption.py --rerender [--mood M] [--search TEXT]   # redraw current captions (font/layout changes)
+    python recaption.py --rerender --render-workers 8           # ... spread over 8 worker processes
+    python recaption.py --rerender --format webp --max-dimension 1024   # convert the library to smaller files
+"""
+import sys
+import json
+import time
+import argparse
+
+from meme_forge import MemeForge
+from meme_encoding import OUTPUT_FORMATS, output_settings
+
+
+def _read_fixes(path):
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                fix = json.loads(line)
+                yield fix["path"], fix["caption"]
+            except (ValueError, KeyError, TypeError):
+                print(f"⚠️  Skipping line {lineno}: expected {{\"path\": ..., \"caption\": ...}}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-caption memes over their stored base images")
+    parser.add_argument("meme", nargs="?", help="meme file to re-caption")
+    parser.add_argument("caption", nargs="?", help='new caption, "top---bottom"')
+    parser.add_argument("--output", help="write the new meme here instead of replacing the original")
+    parser.add_argument("--jsonl", metavar="FILE", help="bulk fixes, one {\"path\", \"caption\"} object per line")
+    parser.add_argument("--rerender", action="store_true", help="redraw every meme with its current caption")
+    parser.add_argument("--mood", help="with --rerender: only memes of this mood")
+    parser.add_argument("--search", help="with --rerender: only memes whose caption/situation matches")
+    parser.add_argument("--workers", type=int, help="parallel renders for bulk runs")
+    parser.add_argument("--render-workers", type=int, default=0, metavar="N",
+                        help="draw captions in N worker processes instead of threads (default: 0)")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS),
+                        help="re-encode in this format; the file extension changes to match (default: keep each meme's format)")
+    parser.add_argument("--quality", type=int, metavar="Q", help="WebP/JPEG quality 1-100")
+    parser.add_argument("--max-dimension", type=int, metavar="PX",
+                        help="downscale so the longer side is at most PX pixels")
+    args = parser.parse_args(argv)
+    output = None
+    if args.format:
+        try:
+            output = output_settings(args.format, args.quality, args.max_dimension)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.quality or args.max_dimension:
+        parser.error("--quality and --max-dimension need --format")
+
+    with MemeForge(render_workers=args.render_workers) as forge:
+        if args.meme:
+            if not args.caption:
+                parser.error("a caption is required")
+            path = forge.recaption(args.meme, args.caption, output_path=args.output, output=output)
+            if path:
+                print(f"✅ Saved to: {path}")
+            return 0 if path else 1
+
+        if args.jsonl:
+            items = list(_read_fixes(args.jsonl))
+        elif args.rerender:
+            items = [(meme["path"], meme["caption"]) for meme in forge.catalog.with_bases(args.mood, args.search)
+                     if meme["caption"]]
+        else:
+            parser.error("give a meme and caption, --jsonl or --rerender")
+
+        print(f"✍️  Re-captioning {len(items)} memes...")
+        start = time.perf_counter()
+        results = forge.recaption_many(items, workers=args.workers, output=output)
+        elapsed = time.perf_counter() - start
+        done = sum(1 for path in results if path)
+        print(f"✅ {done}/{len(items)} memes re-captioned in {elapsed:.2f}s")
+        return 0 if done == len(items) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,86 +3,156 @@ Simple meme viewer utility
 """
 import os
 import json
-from PIL import Image
+from meme_catalog import MemeCatalog
+from meme_thumbnails import contact_sheet
+
+GENERATED_DIR = "static/generated"
+CONTACT_SHEET_PATH = "static/contact_sheet.png"
+PAGE_SIZE = 20
+
+
+def _open_catalog():
+    """Catalog of generated memes, brought up to date with the folder (cheap when unchanged)"""
+    if not os.path.exists(GENERATED_DIR):
+        print("No memes generated yet!")
+        return None
+    catalog = MemeCatalog(directory=GENERATED_DIR)
+    catalog.reconcile()
+    return catalog
+
 
 def view_latest_meme():
     """View the most recently generated meme"""
-    
-    generated_dir = "static/generated"
-    
-    if not os.path.exists(generated_dir):
-        print("No memes generated yet!")
+
+    catalog = _open_catalog()
+    if catalog is None:
         return
-    
-    # Find most recent PNG file
-    png_files = [f for f in os.listdir(generated_dir) if f.endswith('.png')]
-    
-    if not png_files:
+
+    latest = catalog.latest(1)
+
+    if not latest:
         print("No meme images found!")
         return
-    
-    # Sort by modification time
-    png_files.sort(key=lambda x: os.path.getmtime(os.path.join(generated_dir, x)), reverse=True)
-    latest_meme = png_files[0]
-    
+
+    latest_meme = latest[0]
+
     try:
-        img_path = os.path.join(generated_dir, latest_meme)
-        img = Image.open(img_path)
+        from PIL import Image
+        img = Image.open(latest_meme["path"])
         img.show()
-        print(f"Showing: {latest_meme}")
-        
+        print(f"Showing: {latest_meme['filename']}")
+
     except Exception as e:
         print(f"Error viewing image: {e}")
 
-def list_all_memes():
-    """List all generated memes"""
-    
-    generated_dir = "static/generated"
-    
-    if not os.path.exists(generated_dir):
-        print("No memes generated yet!")
-        return
-    
-    png_files = [f for f in os.listdir(generated_dir) if f.endswith('.png')]
-    
-    if not png_files:
-        print("No meme images found!")
-        return
-    
-    print("Generated memes:")
+
+def _print_memes(memes, start):
+    for i, meme in enumerate(memes, start):
+        details = f"{meme['size_bytes']} bytes"
+        if meme["width"] and meme["height"]:
+            details += f", {meme['width']}x{meme['height']}"
+        if meme["mood"]:
+            details += f", {meme['mood']}"
+        print(f"{i}. {meme['filename']} ({details})")
+        if meme["caption"]:
+            print(f"   {meme['caption'].replace(chr(10), ' ')}")
+
+
+def list_all_memes(page=1, mood=None, text=None, page_size=PAGE_SIZE):
+    """List generated memes, newest first, one page at a time; returns False when no more pages"""
+
+    catalog = _open_catalog()
+    if catalog is None:
+        return False
+
+    offset = (page - 1) * page_size
+    # Fetch one extra row to know whether another page follows
+    memes = catalog.query(mood=mood, text=text, limit=page_size + 1, offset=offset)
+    has_more = len(memes) > page_size
+    memes = memes[:page_size]
+
+    if not memes:
+        print("No meme images found!" if page == 1 else "No more memes.")
+        return False
+
+    print(f"Generated memes (page {page}):")
     print("=" * 40)
-    
-    for i, filename in enumerate(sorted(png_files), 1):
-        filepath = os.path.join(generated_dir, filename)
-        size = os.path.getsize(filepath)
-        print(f"{i}. {filename} ({size} bytes)")
-    
+    _print_memes(memes, offset + 1)
+
     # Show summary if available
-    summary_path = os.path.join(generated_dir, "batch_summary.json")
-    if os.path.exists(summary_path):
+    summary_path = os.path.join(GENERATED_DIR, "batch_summary.json")
+    if page == 1 and os.path.exists(summary_path):
         with open(summary_path) as f:
             summary = json.load(f)
         print(f"\nBatch summary: {summary['total_generated']} memes generated")
+    return has_more
+
+
+def show_contact_sheet(count=20, mood=None, text=None, columns=5):
+    """Show the newest memes tiled as thumbnails in one image"""
+
+    catalog = _open_catalog()
+    if catalog is None:
+        return
+
+    memes = catalog.query(mood=mood, text=text, limit=count)
+    if not memes:
+        print("No meme images found!")
+        return
+
+    try:
+        from PIL import Image
+        sheet_path = contact_sheet([meme["path"] for meme in memes], CONTACT_SHEET_PATH, columns=columns)
+        Image.open(sheet_path).show()
+        print(f"Showing contact sheet of {len(memes)} memes: {sheet_path}")
+    except Exception as e:
+        print(f"Error building contact sheet: {e}")
+
+
+def _browse(mood=None, text=None):
+    """Page through list_all_memes until the user stops"""
+    page = 1
+    while list_all_memes(page, mood=mood, text=text):
+        if input("More? (y/n): ").strip().lower() not in ("y", "yes", ""):
+            break
+        page += 1
+
 
 def main():
     """Main viewer interface"""
-    
+
     while True:
         print("\n🖼️  Meme Viewer")
         print("1. View latest meme")
-        print("2. List all memes") 
-        print("3. Quit")
-        
-        choice = input("Choose option (1-3): ").strip()
-        
+        print("2. List all memes")
+        print("3. Filter by mood")
+        print("4. Search text")
+        print("5. Contact sheet of latest memes")
+        print("6. Rescan folder")
+        print("7. Quit")
+
+        choice = input("Choose option (1-7): ").strip()
+
         if choice == "1":
             view_latest_meme()
         elif choice == "2":
-            list_all_memes()
+            _browse()
         elif choice == "3":
+            _browse(mood=input("Mood: ").strip())
+        elif choice == "4":
+            _browse(text=input("Search for: ").strip())
+        elif choice == "5":
+            count = input("How many memes (default 20): ").strip()
+            show_contact_sheet(int(count) if count.isdigit() else 20)
+        elif choice == "6":
+            catalog = _open_catalog()
+            if catalog is not None:
+                added, updated, removed = catalog.reconcile(force=True)
+                print(f"Catalog updated: {added} added, {updated} updated, {removed} removed")
+        elif choice == "7":
             break
         else:
             print("Invalid choice!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()